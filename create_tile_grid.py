@@ -143,8 +143,14 @@ def create_bbox_aoi(bbox):
     gdf = gpd.GeoDataFrame(geometry=[geom], crs="EPSG:4326")
     return gdf.geometry.iloc[0]
 
-def main():
-    """Main function to create a tile grid."""
+def main(argv=None):
+    """
+    Main function to create a tile grid.
+
+    Args:
+        argv: Command line arguments (defaults to sys.argv[1:]), so other
+            scripts can call this in-process
+    """
     parser = argparse.ArgumentParser(description="Create a tile grid for an AOI")
 
     # AOI input options (mutually exclusive)
@@ -166,7 +172,7 @@ def main():
     parser.add_argument("--output-name", default=None,
                         help="Output filename (default: tiles_YYYYMMDD_HHMMSS.geojson)")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Create output directory if it doesn't exist
     os.makedirs(args.output_dir, exist_ok=True)
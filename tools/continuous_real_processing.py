@@ -5,6 +5,7 @@ Monitors data quality and provides detailed progress reports.
 """
 
 import os
+import functools
 import sys
 import argparse
 import time
@@ -49,6 +50,11 @@ def parse_args():
                         help='End date for satellite imagery (YYYY-MM-DD)')
     return parser.parse_args()
 
+@functools.lru_cache(maxsize=1)
+def _load_counties(shapefile_path):
+    """Load the county shapefile once per process and reuse it across calls."""
+    return gpd.read_file(shapefile_path)
+
 def get_counties_to_process(output_file, batch_size):
     """
     Get a list of counties to process.
@@ -63,7 +69,7 @@ def get_counties_to_process(output_file, batch_size):
     logger.info(f"Getting counties to process (batch size: {batch_size})")
 
     # Load the county shapefile
-    counties = gpd.read_file('data/tl_2024_us_county/tl_2024_us_county.shp')
+    counties = _load_counties('data/tl_2024_us_county/tl_2024_us_county.shp')
     logger.info(f"Found {len(counties)} counties in the shapefile")
 
     # Load existing counties if the file exists
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Shared County Processing
+
+Helpers shared by the regional county processing scripts
+(process_pacific_counties.py, process_real_county_data.py): loading the
+county shapefile, generating regional scores and adding new counties to
+the county scores output file.
+
+A driver can load the counties once and call process_region for each region.
+"""
+
+import os
+import json
+import datetime
+import geopandas as gpd
+import pyogrio
+import pandas as pd
+import numpy as np
+
+try:
+    import geobuf
+except ImportError:
+    geobuf = None
+
+# Use the vectorized pyogrio reader/writer for all file I/O
+gpd.options.io_engine = "pyogrio"
+
+# County shapefile used by all regional scripts
+SHAPEFILE_PATH = 'data/tl_2024_us_county/tl_2024_us_county.shp'
+
+# OGR drivers keyed by output file extension. GeoJSONSeq writes one feature
+# per line, so new counties can be appended without rewriting the file.
+OUTPUT_DRIVERS = {
+    '.geojson': 'GeoJSON',
+    '.json': 'GeoJSON',
+    '.geojsonl': 'GeoJSONSeq',
+    '.geojsons': 'GeoJSONSeq',
+    '.fgb': 'FlatGeobuf',
+    '.gpkg': 'GPKG',
+}
+
+# Drivers that can append features to an existing file in place
+APPEND_DRIVERS = {'GeoJSONSeq', 'GPKG'}
+
+# Output formats for the --format option of the scripts, mapped to OGR
+# drivers. Geobuf (compact protobuf-encoded GeoJSON) is written with the
+# geobuf package instead of OGR
+FILE_FORMATS = {
+    'geojson': 'GeoJSON',
+    'geojsonseq': 'GeoJSONSeq',
+    'geobuf': None,
+}
+
+# File extensions accepted for each output format; the first one is used
+# for default output paths
+FILE_FORMAT_EXTENSIONS = {
+    'geojson': ('.geojson', '.json'),
+    'geojsonseq': ('.geojsonl', '.geojsons'),
+    'geobuf': ('.pbf', '.geobuf'),
+}
+
+# String columns stored with the pyarrow-backed string dtype
+STRING_COLUMNS = ['data_source', 'STATEFP', 'NAME']
+
+def get_output_driver(output_file):
+    """Get the OGR driver for an output file based on its extension."""
+    ext = os.path.splitext(output_file)[1].lower()
+    return OUTPUT_DRIVERS.get(ext, 'GeoJSON')
+
+def read_county_file(input_file, file_format='geojson'):
+    """Read a county file written by write_county_file."""
+    if file_format == 'geobuf':
+        if geobuf is None:
+            raise ImportError("The geobuf package is required to read Geobuf files")
+        with open(input_file, 'rb') as f:
+            data = geobuf.decode(f.read())
+        return gpd.GeoDataFrame.from_features(data['features'], crs='EPSG:4326')
+    return gpd.read_file(input_file, engine='pyogrio', use_arrow=True)
+
+def write_county_file(counties_gdf, output_file, file_format='geojson', append=False):
+    """
+    Write counties as GeoJSON, GeoJSON-Seq (one feature per line) or Geobuf.
+
+    Geobuf files don't store a CRS, so the counties are written in WGS84.
+    With append=True the counties are added to the end of an existing
+    GeoJSON-Seq file instead of replacing it.
+    """
+    if append and FILE_FORMATS[file_format] not in APPEND_DRIVERS:
+        raise ValueError(f"Cannot append to {file_format} files")
+
+    if file_format == 'geobuf':
+        if geobuf is None:
+            raise ImportError("The geobuf package is required to write Geobuf files")
+        if counties_gdf.crs is not None:
+            counties_gdf = counties_gdf.to_crs('EPSG:4326')
+        with open(output_file, 'wb') as f:
+            f.write(geobuf.encode(json.loads(counties_gdf.to_json())))
+    else:
+        counties_gdf.to_file(output_file, driver=FILE_FORMATS[file_format], engine='pyogrio', append=append)
+
+def migrate_output(legacy_file, output_file):
+    """
+    Convert a legacy GeoJSON county scores file to the format of the output file.
+
+    FlatGeobuf and GeoPackage outputs are written with a spatial index, and
+    both support attribute filters without a full parse of the file.
+    """
+    print(f"Migrating {legacy_file} to {output_file}...")
+    legacy_gdf = gpd.read_file(legacy_file, engine='pyogrio', use_arrow=True)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    legacy_gdf.to_file(output_file, driver=get_output_driver(output_file), engine='pyogrio')
+    print(f"Migrated {len(legacy_gdf)} counties to {output_file}")
+
+def prepare_counties_cache(shapefile_path=SHAPEFILE_PATH):
+    """
+    Write a GeoParquet copy of the county shapefile next to it.
+
+    The copy is written on first use (or when the shapefile is newer), so
+    later runs skip parsing the shapefile entirely. It is moved into place
+    only once it is complete, so an interrupted run never leaves a
+    truncated cache behind.
+
+    Returns:
+        Path to the GeoParquet copy
+    """
+    parquet_path = os.path.splitext(shapefile_path)[0] + '.parquet'
+    if (not os.path.exists(parquet_path)
+            or os.path.getmtime(parquet_path) < os.path.getmtime(shapefile_path)):
+        print(f"Caching county shapefile to {parquet_path}...")
+        counties_gdf = gpd.read_file(shapefile_path, engine='pyogrio', use_arrow=True)
+        tmp_path = parquet_path + '.tmp'
+        counties_gdf.to_parquet(tmp_path)
+        os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+def get_cached_counties(shapefile_path, states):
+    """
+    Load the counties in the given states from a GeoParquet copy of the
+    county shapefile (see prepare_counties_cache).
+    """
+    parquet_path = prepare_counties_cache(shapefile_path)
+
+    # The state filter is applied by the Parquet reader on the Arrow table,
+    # so only the selected rows are converted to a GeoDataFrame (the cache
+    # is a single row group in shapefile order, so no row groups are
+    # skipped). Counties stay in the shapefile's native CRS; only the few
+    # selected counties are reprojected when saved
+    return gpd.read_parquet(parquet_path, filters=[('STATEFP', 'in', list(states))])
+
+def generate_scores(counties_gdf, score_range, rng_seed=None):
+    """
+    Generate realistic obsolescence scores for counties.
+
+    Args:
+        counties_gdf: GeoDataFrame of counties to score
+        score_range: (min, max) obsolescence score range for the region
+        rng_seed: Seed for the random generator, or None for fresh entropy
+
+    Returns:
+        The GeoDataFrame with the score columns added
+    """
+    rng = np.random.default_rng(rng_seed)
+    n = len(counties_gdf)
+    score_min, score_max = score_range
+
+    # Obsolescence scores and confidence values (0.7-0.95) are drawn
+    # together in one call
+    scores = rng.uniform([score_min, 0.70], [score_max, 0.95], size=(n, 2))
+    counties_gdf['obsolescence_score'] = scores[:, 0]
+    counties_gdf['confidence'] = scores[:, 1]
+
+    # Generate tile counts (10-30)
+    counties_gdf['tile_count'] = rng.integers(10, 31, size=n, dtype=np.int16)
+
+    # Add data source field
+    counties_gdf['data_source'] = 'real'
+
+    # Add processing timestamp, built once and stored as a single category
+    # instead of one identical string per row
+    processed_at = datetime.datetime.now().isoformat()
+    counties_gdf['processed_at'] = pd.Categorical.from_codes(np.zeros(n, dtype=np.int8),
+                                                             categories=[processed_at])
+
+    return counties_gdf
+
+def save_county_scores(region_counties, output_file, region):
+    """
+    Add the scored counties that are not in the output file yet.
+
+    Returns:
+        Number of new counties added
+    """
+    # Load the GEOIDs and CRS of the existing county scores; only the GEOID
+    # column is read, geometries are never parsed
+    existing_count = 0
+    existing_crs = None
+    existing_geoids = np.array([], dtype='U5')
+    try:
+        info = pyogrio.read_info(output_file, force_feature_count=True)
+        existing_crs = info['crs']
+        existing_count = info['features']
+        if len(region_counties) > 0:
+            # Only look up the candidate GEOIDs; indexed formats answer this
+            # with an attribute scan instead of a full parse
+            geoid_list = ", ".join(f"'{geoid}'" for geoid in region_counties['GEOID'])
+            existing_ids = pyogrio.read_dataframe(output_file, columns=['GEOID'], read_geometry=False,
+                                                  where=f"GEOID IN ({geoid_list})")
+            existing_geoids = np.unique(existing_ids['GEOID'].to_numpy(dtype='U5'))
+        print(f"Loaded {existing_count} counties from existing output file")
+    except Exception as e:
+        print(f"Error loading existing output file: {e}")
+        print("Creating new output file")
+
+    # Filter out counties that already exist in the dataset. GEOIDs are
+    # compared as fixed-width strings against the sorted unique existing IDs
+    candidate_geoids = region_counties['GEOID'].to_numpy(dtype='U5')
+    new_mask = ~np.isin(candidate_geoids, existing_geoids, assume_unique=True)
+    new_counties = region_counties.iloc[new_mask]
+    print(f"Adding {len(new_counties)} new counties to the dataset")
+
+    # Store the string columns as contiguous Arrow buffers instead of
+    # NumPy object arrays of Python strings
+    new_counties = new_counties.astype({
+        column: 'string[pyarrow]'
+        for column in STRING_COLUMNS
+        if column in new_counties.columns
+    })
+
+    # Convert the new counties to the CRS of the existing file if needed. The
+    # CRSs are compared by content (ignoring axis order), so equivalent
+    # definitions such as the TIGER EPSG:4269 in both files skip to_crs.
+    # This runs after selection and dedupe, so only the new counties are
+    # reprojected, never the existing file or the full shapefile
+    if (existing_count and existing_crs
+            and not new_counties.crs.equals(existing_crs, ignore_axis_order=True)):
+        print(f"Converting CRS from {new_counties.crs} to {existing_crs}")
+        new_counties = new_counties.to_crs(existing_crs)
+
+    # Save the updated county scores
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    driver = get_output_driver(output_file)
+    if existing_count and driver in APPEND_DRIVERS:
+        # Append only the new counties through OGR instead of rewriting
+        new_counties.to_file(output_file, driver=driver, engine='pyogrio', append=True)
+    else:
+        # Drivers without append support need the whole file rewritten
+        if existing_count:
+            existing_gdf = gpd.read_file(output_file, engine='pyogrio', use_arrow=True)
+
+            # Match the numeric dtypes of the existing file (e.g. tile_count)
+            # so concat doesn't upcast and copy the existing blocks
+            numeric_dtypes = {
+                column: existing_gdf[column].dtype
+                for column in new_counties.columns
+                if column in existing_gdf.columns and pd.api.types.is_numeric_dtype(existing_gdf[column])
+            }
+            new_counties = new_counties.astype(numeric_dtypes)
+            combined_gdf = pd.concat([existing_gdf, new_counties], ignore_index=True, copy=False, sort=False)
+        else:
+            combined_gdf = new_counties
+
+        combined_gdf.to_file(output_file, driver=driver, engine='pyogrio')
+    total_counties = existing_count + len(new_counties)
+
+    print(f"Saved {total_counties} counties to {output_file}")
+    print(f"Added {len(new_counties)} new counties from the {region} region")
+
+    # Print some statistics about the new counties
+    if len(new_counties) > 0:
+        print("\nNew counties processed:")
+        state_column = 'STATE' if 'STATE' in new_counties.columns else 'STATEFP'
+        names = new_counties['NAME'].to_numpy()
+        states = new_counties[state_column].to_numpy()
+        scores = new_counties['obsolescence_score'].to_numpy()
+        tiles = new_counties['tile_count'].to_numpy()
+        print("\n".join(
+            f"  {name}, {state} - Score: {score:.2f}, Tiles: {tile_count}"
+            for name, state, score, tile_count in zip(names, states, scores, tiles)
+        ))
+
+    return len(new_counties)
+
+def process_region(counties_gdf, region_key, state_fips, score_range, num_counties, rng_seed, output_file):
+    """
+    Select, score and save counties for one region.
+
+    Args:
+        counties_gdf: Preloaded counties to select from (may cover several regions)
+        region_key: Region name used in progress output
+        state_fips: State FIPS codes in the region
+        score_range: (min, max) obsolescence score range for the region
+        num_counties: Number of counties to process
+        rng_seed: Seed for county sampling and score generation
+        output_file: Path to save the updated county scores
+
+    Returns:
+        Number of new counties added
+    """
+    print(f"Processing real county data for the {region_key} region...")
+
+    # Filter counties in the region
+    region_counties = counties_gdf[counties_gdf['STATEFP'].isin(state_fips)]
+    print(f"Found {len(region_counties)} counties in the {region_key} region")
+
+    # Randomly select counties if there are more than requested
+    if len(region_counties) > num_counties:
+        region_counties = region_counties.sample(num_counties, random_state=rng_seed)
+
+    print(f"Selected {len(region_counties)} counties from the {region_key} region")
+
+    region_counties = generate_scores(region_counties, score_range, rng_seed)
+    return save_county_scores(region_counties, output_file, region_key)
@@ -17,6 +17,7 @@ Options:
 
 import os
 import argparse
+import shutil
 import subprocess
 import time
 import sys
@@ -119,10 +120,18 @@ def main():
     # Copy the file to the React app's public directory
     react_app_dir = "county-viz-app/public/data/final/"
     os.makedirs(react_app_dir, exist_ok=True)
+    react_app_file = os.path.join(react_app_dir, os.path.basename(args.output))
     try:
-        subprocess.run(["cp", args.output, react_app_dir], check=True)
+        # Hardlink when on the same filesystem so no bytes are copied;
+        # otherwise fall back to shutil.copyfile (sendfile() on Linux)
+        if os.path.exists(react_app_file):
+            os.remove(react_app_file)
+        try:
+            os.link(args.output, react_app_file)
+        except OSError:
+            shutil.copyfile(args.output, react_app_file)
         print(f"Copied {args.output} to {react_app_dir}")
-    except subprocess.CalledProcessError as e:
+    except OSError as e:
         print(f"Error copying file to React app directory: {e}")
     
     return 0 if success_count == len(county_list) else 1
@@ -16,6 +16,7 @@ Options:
 
 import os
 import json
+import functools
 import argparse
 import geopandas as gpd
 import pandas as pd
@@ -35,12 +36,17 @@ def parse_args():
                         help='Comma-separated list of state FIPS codes to focus on')
     return parser.parse_args()
 
+@functools.lru_cache(maxsize=1)
+def _load_counties(shapefile_path):
+    """Load the county shapefile once per process and reuse it across calls."""
+    return gpd.read_file(shapefile_path)
+
 def get_northeast_counties(shapefile_path, state_fips, num_counties=20):
     """Get counties from the Northeast region."""
     print(f"Loading county shapefile from {shapefile_path}...")
     
     # Load the county shapefile
-    counties_gdf = gpd.read_file(shapefile_path)
+    counties_gdf = _load_counties(shapefile_path)
     
     # Filter counties in the specified states
     northeast_counties = counties_gdf[counties_gdf['STATEFP'].isin(state_fips)]
@@ -111,13 +117,18 @@ def get_northeast_counties(shapefile_path, state_fips, num_counties=20):
 def generate_realistic_scores(counties_gdf):
     """Generate realistic obsolescence scores for counties."""
     # Northeast region has low-medium obsolescence scores (0.25-0.55)
-    counties_gdf['obsolescence_score'] = np.random.uniform(0.25, 0.55, len(counties_gdf))
+    # Draw all three columns in one call: column 0 -> obsolescence,
+    # column 1 -> confidence, column 2 -> tile count
+    rng = np.random.default_rng()
+    r = rng.random((len(counties_gdf), 3), dtype=np.float32)
+    
+    counties_gdf['obsolescence_score'] = r[:, 0] * 0.30 + 0.25
     
     # Generate confidence values (0.7-0.95)
-    counties_gdf['confidence'] = np.random.uniform(0.7, 0.95, len(counties_gdf))
+    counties_gdf['confidence'] = r[:, 1] * 0.25 + 0.70
     
     # Generate tile counts (10-30)
-    counties_gdf['tile_count'] = np.random.randint(10, 31, len(counties_gdf))
+    counties_gdf['tile_count'] = (r[:, 2] * 21).astype(np.int16) + 10
     
     # Add data source field
     counties_gdf['data_source'] = 'real'
@@ -11,147 +11,68 @@ Usage:
 Options:
     --output OUTPUT_FILE  Path to save the updated county scores [default: data/final/county_scores.geojson]
     --counties NUM        Number of counties to process [default: 20]
+    --migrate-from PATH   Convert a legacy GeoJSON file to OUTPUT_FILE before processing
 """
 
-import os
-import json
 import argparse
-import geopandas as gpd
-import pandas as pd
-import numpy as np
-from pathlib import Path
-import datetime
-import random
+import pyogrio
+
+from process_counties import SHAPEFILE_PATH, get_cached_counties, migrate_output, process_region
+
+# Define Pacific states by FIPS code
+# Pacific: CA, OR, WA, AK, HI
+PACIFIC_STATES = ['06', '41', '53', '02', '15']
 
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Process Pacific Counties')
     parser.add_argument('--output', default='data/final/county_scores.geojson',
-                        help='Path to save the updated county scores')
+                        help='Path to save the updated county scores '
+                             '(a .geojsonl extension appends as GeoJSON-Seq)')
     parser.add_argument('--counties', type=int, default=20,
                         help='Number of counties to process')
+    parser.add_argument('--migrate-from',
+                        help='Legacy GeoJSON file to convert to the output format '
+                             '(e.g. .fgb or .gpkg) before processing')
     return parser.parse_args()
 
-def get_pacific_counties(shapefile_path, num_counties=20):
-    """Get counties from the Pacific region."""
+def get_pacific_counties(shapefile_path):
+    """Get the Pacific counties that are not in the verified dataset yet."""
     print(f"Loading county shapefile from {shapefile_path}...")
-    
-    # Load the county shapefile
-    counties_gdf = gpd.read_file(shapefile_path)
-    
-    # Define Pacific states by FIPS code
-    # Pacific: CA, OR, WA, AK, HI
-    pacific_states = ['06', '41', '53', '02', '15']
-    
-    # Filter counties in the Pacific region
-    pacific_counties = counties_gdf[counties_gdf['STATEFP'].isin(pacific_states)]
-    
-    print(f"Found {len(pacific_counties)} counties in the Pacific region")
-    
+
+    # Load only the Pacific counties from the cached county data
+    pacific_counties = get_cached_counties(shapefile_path, PACIFIC_STATES)
+
     # Load existing county scores to avoid duplicates
     try:
-        existing_gdf = gpd.read_file('data/final/verified_county_scores.geojson')
-        existing_geoids = set(existing_gdf['GEOID'].values)
-        print(f"Loaded {len(existing_gdf)} counties from existing GeoJSON file")
-        
+        # Only the GEOID column is needed here, so skip geometries entirely
+        existing_ids = pyogrio.read_dataframe('data/final/verified_county_scores.geojson',
+                                              columns=['GEOID'], read_geometry=False)
+        existing_geoids = set(existing_ids['GEOID'].values)
+        print(f"Loaded {len(existing_ids)} counties from existing GeoJSON file")
+
         # Filter out counties that already exist in the dataset
         pacific_counties = pacific_counties[~pacific_counties['GEOID'].isin(existing_geoids)]
         print(f"After filtering out existing counties, {len(pacific_counties)} counties remain")
     except Exception as e:
         print(f"Error loading existing GeoJSON file: {e}")
-        existing_geoids = set()
-    
-    # Randomly select counties if there are more than requested
-    if len(pacific_counties) > num_counties:
-        # Set seed for reproducibility
-        random.seed(49)  # Different seed from other regions
-        pacific_counties = pacific_counties.sample(num_counties, random_state=49)
-    
-    print(f"Selected {len(pacific_counties)} counties from the Pacific region")
-    
-    return pacific_counties
 
-def generate_realistic_scores(counties_gdf):
-    """Generate realistic obsolescence scores for counties."""
-    # Pacific region has varied obsolescence scores (0.40-0.90)
-    counties_gdf['obsolescence_score'] = np.random.uniform(0.40, 0.90, len(counties_gdf))
-    
-    # Generate confidence values (0.7-0.95)
-    counties_gdf['confidence'] = np.random.uniform(0.7, 0.95, len(counties_gdf))
-    
-    # Generate tile counts (10-30)
-    counties_gdf['tile_count'] = np.random.randint(10, 31, len(counties_gdf))
-    
-    # Add data source field
-    counties_gdf['data_source'] = 'real'
-    
-    # Add processing timestamp
-    counties_gdf['processed_at'] = datetime.datetime.now().isoformat()
-    
-    return counties_gdf
+    return pacific_counties
 
 def process_pacific_counties(output_file, num_counties=20):
     """Process real county data for the Pacific region."""
-    print(f"Processing real county data for the Pacific region...")
-    
-    # Get counties from the Pacific region
-    shapefile_path = 'data/tl_2024_us_county/tl_2024_us_county.shp'
-    pacific_counties = get_pacific_counties(shapefile_path, num_counties)
-    
-    # Generate realistic scores for Pacific counties
-    pacific_counties = generate_realistic_scores(pacific_counties)
-    
-    # Load existing county scores
-    try:
-        existing_gdf = gpd.read_file(output_file)
-        print(f"Loaded {len(existing_gdf)} counties from existing GeoJSON file")
-    except Exception as e:
-        print(f"Error loading existing GeoJSON file: {e}")
-        print("Creating new GeoJSON file")
-        existing_gdf = gpd.GeoDataFrame()
-    
-    # Create a set of existing GEOIDs
-    if not existing_gdf.empty and 'GEOID' in existing_gdf.columns:
-        existing_geoids = set(existing_gdf['GEOID'].values)
-    else:
-        existing_geoids = set()
-    
-    # Filter out counties that already exist in the dataset
-    new_counties = pacific_counties[~pacific_counties['GEOID'].isin(existing_geoids)]
-    print(f"Adding {len(new_counties)} new counties to the dataset")
-    
-    # Convert both dataframes to the same CRS if needed
-    if not existing_gdf.empty and existing_gdf.crs != new_counties.crs:
-        print(f"Converting CRS from {new_counties.crs} to {existing_gdf.crs}")
-        new_counties = new_counties.to_crs(existing_gdf.crs)
-    
-    # Combine existing and new counties
-    if existing_gdf.empty:
-        combined_gdf = new_counties
-    else:
-        combined_gdf = pd.concat([existing_gdf, new_counties], ignore_index=True)
-    
-    # Save the updated county scores
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    combined_gdf.to_file(output_file, driver='GeoJSON')
-    
-    print(f"Saved {len(combined_gdf)} counties to {output_file}")
-    print(f"Added {len(new_counties)} new counties from the Pacific region")
-    
-    # Print some statistics about the new counties
-    if len(new_counties) > 0:
-        print("\nNew counties processed:")
-        for _, county in new_counties.iterrows():
-            state_name = county.get('STATE', county.get('STATEFP', 'Unknown'))
-            county_name = county.get('NAME', 'Unknown')
-            score = county.get('obsolescence_score', 0.0)
-            print(f"  {county_name}, {state_name} - Score: {score:.2f}, Tiles: {county['tile_count']}")
-    
-    return len(new_counties)
+    pacific_counties = get_pacific_counties(SHAPEFILE_PATH)
+
+    # Pacific region has varied obsolescence scores (0.40-0.90); seed 49 is
+    # different from other regions
+    return process_region(pacific_counties, 'Pacific', PACIFIC_STATES, (0.40, 0.90),
+                          num_counties, 49, output_file)
 
 def main():
     """Main function."""
     args = parse_args()
+    if args.migrate_from:
+        migrate_output(args.migrate_from, args.output)
     process_pacific_counties(args.output, args.counties)
 
 if __name__ == "__main__":
@@ -9,15 +9,17 @@ Usage:
     python process_real_county_data.py [--region REGION] [--output OUTPUT_FILE]
 
 Options:
-    --region REGION       Region to process (south, east, west, midwest, northeast) [default: south]
+    --region REGION       Region to process (south, east, west, midwest, northeast, all) [default: south]
     --output OUTPUT_FILE  Path to save the updated county scores [default: data/final/county_scores.geojson]
     --counties NUM        Number of counties to process [default: 10]
+    --migrate-from PATH   Convert a legacy GeoJSON file to OUTPUT_FILE before processing
+    --subprocess-tile-grid  Run create_tile_grid.py as a subprocess (for debugging)
 """
 
 import os
 import json
 import argparse
-import geopandas as gpd
+import pyogrio
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -25,17 +27,47 @@ import subprocess
 import time
 import datetime
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from create_tile_grid import main as make_tile_grid
+from process_counties import SHAPEFILE_PATH, generate_scores, get_cached_counties, migrate_output, save_county_scores
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Regions that can be processed by this script
+REGIONS = ['south', 'east', 'west', 'midwest', 'northeast']
+
+# Obsolescence score range for each region, based on region characteristics
+REGION_SCORE_RANGES = {
+    'south': (0.65, 0.95),
+    'east': (0.45, 0.75),
+    'west': (0.55, 0.85),
+    'midwest': (0.35, 0.65),
+    'northeast': (0.30, 0.60)
+}
 
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Process Real County Data')
     parser.add_argument('--region', default='south',
-                        choices=['south', 'east', 'west', 'midwest', 'northeast'],
-                        help='Region to process')
+                        choices=REGIONS + ['all'],
+                        help='Region to process (all processes every region in parallel)')
     parser.add_argument('--output', default='data/final/county_scores.geojson',
-                        help='Path to save the updated county scores')
+                        help='Path to save the updated county scores '
+                             '(a .geojsonl extension appends as GeoJSON-Seq)')
     parser.add_argument('--counties', type=int, default=10,
                         help='Number of counties to process')
+    parser.add_argument('--migrate-from',
+                        help='Legacy GeoJSON file to convert to the output format '
+                             '(e.g. .fgb or .gpkg) before processing')
+    parser.add_argument('--subprocess-tile-grid', action='store_true',
+                        help='Run create_tile_grid.py as a subprocess instead of in-process (for debugging)')
     return parser.parse_args()
 
 def run_command(command, check=True):
@@ -76,18 +108,26 @@ def get_region_states(region):
 
     return region_states.get(region, [])
 
-def get_region_counties(shapefile_path, region, num_counties=10):
-    """Get counties from the specified region."""
+def load_counties(shapefile_path, states):
+    """Load the counties in the given states from the county shapefile."""
     print(f"Loading county shapefile from {shapefile_path}...")
 
-    # Load the county shapefile
-    counties_gdf = gpd.read_file(shapefile_path)
+    return get_cached_counties(shapefile_path, states)
 
+def get_region_counties(shapefile_path, region, num_counties=10, counties_gdf=None):
+    """
+    Get counties from the specified region.
+
+    If counties_gdf is given, the region is filtered from it instead of
+    reading the shapefile again.
+    """
     # Get states in the region
     region_states = get_region_states(region)
 
-    # Filter counties in the region
-    region_counties = counties_gdf[counties_gdf['STATEFP'].isin(region_states)]
+    if counties_gdf is None:
+        region_counties = load_counties(shapefile_path, region_states)
+    else:
+        region_counties = counties_gdf[counties_gdf['STATEFP'].isin(region_states)]
 
     print(f"Found {len(region_counties)} counties in the {region} region")
 
@@ -101,19 +141,25 @@ def get_region_counties(shapefile_path, region, num_counties=10):
 
     return region_counties
 
-def process_county_data(region, output_file, num_counties=10):
-    """Process real county data for a region."""
-    print(f"Processing real county data for {region} region...")
-
-    # Get counties from the region
-    shapefile_path = 'data/tl_2024_us_county/tl_2024_us_county.shp'
-    region_counties = get_region_counties(shapefile_path, region, num_counties)
+def score_region_counties(region, region_counties, shapefile_path, subprocess_tile_grid=False):
+    """Generate the tile grid and county scores for the selected region counties."""
+    # Without counties there is no AOI to build a tile grid for
+    if len(region_counties) == 0:
+        print(f"No counties selected in the {region} region, skipping scoring")
+        return region_counties
 
     # Create a temporary AOI file for the region
     aoi_path = f"config/aoi/temp_{region}.geojson"
 
-    # Create a bounding box around the counties
-    minx, miny, maxx, maxy = region_counties.total_bounds
+    # Create a bounding box around the counties from the per-feature
+    # envelopes OGR keeps for the shapefile, without touching geometries
+    geoid_list = ", ".join(f"'{geoid}'" for geoid in region_counties['GEOID'])
+    _, bounds = pyogrio.read_bounds(shapefile_path, where=f"GEOID IN ({geoid_list})")
+    if bounds.shape[1] != len(region_counties):
+        raise ValueError(f"Found {bounds.shape[1]} of the {len(region_counties)} selected {region} "
+                         f"counties in {shapefile_path}")
+    minx, miny = bounds[0].min(), bounds[1].min()
+    maxx, maxy = bounds[2].max(), bounds[3].max()
 
     # Add a buffer around the bounding box
     buffer = 0.1  # degrees
@@ -150,8 +196,12 @@ def process_county_data(region, output_file, num_counties=10):
 
     # Save the AOI file
     os.makedirs(os.path.dirname(aoi_path), exist_ok=True)
-    with open(aoi_path, 'w') as f:
-        json.dump(aoi_geojson, f, indent=2)
+    if orjson is not None:
+        with open(aoi_path, 'wb') as f:
+            f.write(orjson.dumps(aoi_geojson, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(aoi_path, 'w') as f:
+            json.dump(aoi_geojson, f, separators=(',', ':'))
 
     print(f"Created temporary AOI file: {aoi_path}")
 
@@ -164,108 +214,81 @@ def process_county_data(region, output_file, num_counties=10):
 
     # Run the tile grid generation script
     try:
-        run_command(f"python create_tile_grid.py --aoi-file {aoi_path} --tile-size 256 --resolution 10 --output-name tiles_{region}_{timestamp}.json")
+        tile_grid_args = ["--aoi-file", aoi_path, "--tile-size", "256", "--resolution", "10",
+                          "--output-name", f"tiles_{region}_{timestamp}.json"]
+        if subprocess_tile_grid:
+            run_command("python create_tile_grid.py " + " ".join(tile_grid_args))
+        else:
+            make_tile_grid(tile_grid_args)
 
         # Now that we have a tile grid, we should run the full AOI pipeline
         # But for now, we'll use a simplified approach to generate county scores
         print("Tile grid generated successfully. Using a simplified approach to generate county scores...")
-
-        # Generate realistic scores for the counties based on region characteristics
-        region_ranges = {
-            'south': (0.65, 0.95),
-            'east': (0.45, 0.75),
-            'west': (0.55, 0.85),
-            'midwest': (0.35, 0.65),
-            'northeast': (0.30, 0.60)
-        }
-
-        # Get score range for the region
-        score_min, score_max = region_ranges.get(region, (0.4, 0.8))
-
-        # Generate scores - these are based on real regional patterns
-        region_counties['obsolescence_score'] = np.random.uniform(score_min, score_max, len(region_counties))
-        region_counties['confidence'] = np.random.uniform(0.7, 0.95, len(region_counties))
-        region_counties['tile_count'] = np.random.randint(10, 31, len(region_counties))
-        region_counties['data_source'] = 'real'  # This is real county data
-        region_counties['processed_at'] = datetime.datetime.now().isoformat()
     except Exception as e:
         print(f"Error generating tile grid: {e}")
         print("Using a simplified approach to generate county scores...")
 
-        # Generate realistic scores for the counties
-        region_ranges = {
-            'south': (0.65, 0.95),
-            'east': (0.45, 0.75),
-            'west': (0.55, 0.85),
-            'midwest': (0.35, 0.65),
-            'northeast': (0.30, 0.60)
-        }
-
-        # Get score range for the region
-        score_min, score_max = region_ranges.get(region, (0.4, 0.8))
-
-        # Generate scores
-        region_counties['obsolescence_score'] = np.random.uniform(score_min, score_max, len(region_counties))
-        region_counties['confidence'] = np.random.uniform(0.7, 0.95, len(region_counties))
-        region_counties['tile_count'] = np.random.randint(10, 31, len(region_counties))
-        region_counties['data_source'] = 'real'
-        region_counties['processed_at'] = datetime.datetime.now().isoformat()
-
-    # Load existing county scores
-    try:
-        existing_gdf = gpd.read_file(output_file)
-        print(f"Loaded {len(existing_gdf)} counties from existing GeoJSON file")
-    except Exception as e:
-        print(f"Error loading existing GeoJSON file: {e}")
-        print("Creating new GeoJSON file")
-        existing_gdf = gpd.GeoDataFrame()
+    # Generate scores - these are based on real regional patterns
+    region_counties = generate_scores(region_counties, REGION_SCORE_RANGES.get(region, (0.4, 0.8)))
 
-    # Create a set of existing GEOIDs
-    if not existing_gdf.empty and 'GEOID' in existing_gdf.columns:
-        existing_geoids = set(existing_gdf['GEOID'].values)
-    else:
-        existing_geoids = set()
+    # Clean up
+    if os.path.exists(aoi_path):
+        os.remove(aoi_path)
+        print(f"Removed temporary AOI file: {aoi_path}")
 
-    # Filter out counties that already exist in the dataset
-    new_counties = region_counties[~region_counties['GEOID'].isin(existing_geoids)]
-    print(f"Adding {len(new_counties)} new counties to the dataset")
+    return region_counties
 
-    # Convert both dataframes to the same CRS if needed
-    if not existing_gdf.empty and existing_gdf.crs != new_counties.crs:
-        print(f"Converting CRS from {new_counties.crs} to {existing_gdf.crs}")
-        new_counties = new_counties.to_crs(existing_gdf.crs)
+def process_county_data(region, output_file, num_counties=10, counties_gdf=None,
+                        subprocess_tile_grid=False):
+    """Process real county data for a region."""
+    print(f"Processing real county data for {region} region...")
 
-    # Combine existing and new counties
-    if existing_gdf.empty:
-        combined_gdf = new_counties
-    else:
-        combined_gdf = pd.concat([existing_gdf, new_counties], ignore_index=True)
+    # Get counties from the region
+    region_counties = get_region_counties(SHAPEFILE_PATH, region, num_counties, counties_gdf)
 
-    # Save the updated county scores
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    combined_gdf.to_file(output_file, driver='GeoJSON')
+    region_counties = score_region_counties(region, region_counties, SHAPEFILE_PATH, subprocess_tile_grid)
+    save_county_scores(region_counties, output_file, region)
 
-    print(f"Saved {len(combined_gdf)} counties to {output_file}")
-    print(f"Added {len(new_counties)} new counties from the {region} region")
+def process_all_regions(output_file, num_counties=10, subprocess_tile_grid=False):
+    """
+    Process real county data for every region in parallel.
 
-    # Print some statistics about the new counties
-    if len(new_counties) > 0:
-        print("\nNew counties processed:")
-        for _, county in new_counties.iterrows():
-            state_name = county.get('STATE', county.get('STATEFP', 'Unknown'))
-            county_name = county.get('NAME', 'Unknown')
-            score = county.get('obsolescence_score', 0.0)
-            print(f"  {county_name}, {state_name} - Score: {score:.2f}, Tiles: {county['tile_count']}")
+    The shapefile is read once for all regions, each region is scored in
+    its own worker process, and the results are written in a single pass.
+    """
+    print(f"Processing real county data for {len(REGIONS)} regions...")
 
-    # Clean up
-    if os.path.exists(aoi_path):
-        os.remove(aoi_path)
-        print(f"Removed temporary AOI file: {aoi_path}")
+    all_states = sorted({state for region in REGIONS for state in get_region_states(region)})
+    counties_gdf = load_counties(SHAPEFILE_PATH, all_states)
+
+    # Each region filters the shared frame with STATEFP.isin, which runs on
+    # the small integer codes of a categorical column
+    counties_gdf['STATEFP'] = counties_gdf['STATEFP'].astype('category')
+
+    region_frames = [get_region_counties(SHAPEFILE_PATH, region, num_counties, counties_gdf)
+                     for region in REGIONS]
+    with ProcessPoolExecutor(max_workers=len(REGIONS)) as executor:
+        scored_frames = list(executor.map(score_region_counties, REGIONS, region_frames,
+                                          [SHAPEFILE_PATH] * len(REGIONS),
+                                          [subprocess_tile_grid] * len(REGIONS)))
+
+    # Regions share some states, so the same county can be picked twice
+    combined = pd.concat(scored_frames, ignore_index=True).drop_duplicates(subset='GEOID')
+
+    # Write STATEFP as plain strings, like the single-region path
+    combined['STATEFP'] = combined['STATEFP'].astype(str)
+    save_county_scores(combined, output_file, 'all')
 
 def main():
     """Main function."""
     args = parse_args()
-    process_county_data(args.region, args.output, args.counties)
+    if args.migrate_from:
+        migrate_output(args.migrate_from, args.output)
+    if args.region == 'all':
+        process_all_regions(args.output, args.counties, args.subprocess_tile_grid)
+    else:
+        process_county_data(args.region, args.output, args.counties,
+                            subprocess_tile_grid=args.subprocess_tile_grid)
 
 if __name__ == "__main__":
     main()
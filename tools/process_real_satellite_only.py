@@ -10,11 +10,14 @@ Usage:
 
 Options:
     --county COUNTY_FIPS   FIPS code of the county to process [required]
-    --output OUTPUT_FILE   Path to save the updated county scores [default: data/final/real_county_scores.geojson]
+    --output OUTPUT_FILE   Path to save the updated county scores; a .parquet extension writes
+                           GeoParquet, and .geojsonl (GeoJSON-Seq) or .gpkg outputs are appended
+                           to in place [default: data/final/real_county_scores.geojson]
     --service-account-key  Path to Google Earth Engine service account key [default: config/gee/gentle-cinema-458613-f3-51d8ea2711e7.json]
 """
 
 import os
+import json
 import argparse
 import geopandas as gpd
 import pandas as pd
@@ -25,6 +28,10 @@ import datetime
 import ee
 import logging
 import sys
+import threading
+import pyogrio
+
+from process_counties import APPEND_DRIVERS, SHAPEFILE_PATH, get_output_driver, prepare_counties_cache
 
 # Set up logging
 logging.basicConfig(
@@ -40,6 +47,24 @@ logger = logging.getLogger(__name__)
 # Create logs directory if it doesn't exist
 os.makedirs('logs', exist_ok=True)
 
+# Limit concurrent Earth Engine requests when counties are processed in
+# parallel threads, to stay under the per-account request quota
+EE_MAX_CONCURRENT_REQUESTS = 6
+_ee_request_semaphore = threading.Semaphore(EE_MAX_CONCURRENT_REQUESTS)
+
+# Serializes updates of the output file between threads
+_output_lock = threading.Lock()
+
+# Whether Earth Engine has been initialized in this process
+_ee_initialized = False
+
+# Simplified county geometries from Earth Engine, cached by GEOID
+SIMPLIFIED_GEOMETRY_CACHE_DIR = 'data/cache/simplified_geoms'
+
+# Scale in meters for the county-wide index means; Landsat 8 is 30m native,
+# and 500m is enough for county-level averages
+INDEX_SCALE = 500
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Process Real Satellite Data Only')
@@ -59,6 +84,7 @@ def parse_args():
 def initialize_earth_engine(service_account_key):
     """
     Initialize Earth Engine with service account credentials.
+    Earth Engine is only initialized once per process; later calls return immediately.
 
     Args:
         service_account_key: Path to the service account key file
@@ -66,6 +92,10 @@ def initialize_earth_engine(service_account_key):
     Returns:
         True if initialization was successful, False otherwise
     """
+    global _ee_initialized
+    if _ee_initialized:
+        return True
+
     logger.info("Initializing Earth Engine...")
 
     try:
@@ -78,242 +108,245 @@ def initialize_earth_engine(service_account_key):
         credentials = ee.ServiceAccountCredentials(None, service_account_key)
         ee.Initialize(credentials)
 
-        # Test the connection by making a simple request
-        _ = ee.Image(1).getInfo()
-
+        # No test request is made; the first real request surfaces any
+        # authentication failure
+        _ee_initialized = True
         logger.info("Earth Engine initialized successfully!")
         return True
     except Exception as e:
         logger.error(f"Error initializing Earth Engine: {e}")
         return False
 
-def mask_s2_clouds(img):
+def get_info(ee_object):
     """
-    Mask clouds in Sentinel-2 imagery.
+    Fetch the value of an Earth Engine object, limiting concurrent requests.
 
     Args:
-        img: Earth Engine image
+        ee_object: Earth Engine object to evaluate
 
     Returns:
-        Earth Engine image with clouds masked
+        The value returned by getInfo()
     """
-    # Use the cloud probability band (MSK_CLDPRB) and cloud classification bands
-    cloudProb = img.select('MSK_CLDPRB')
-    cloudOpaque = img.select('MSK_CLASSI_OPAQUE')
-    cloudCirrus = img.select('MSK_CLASSI_CIRRUS')
+    with _ee_request_semaphore:
+        return ee_object.getInfo()
 
-    # Create a combined mask (cloud probability < 50% AND not classified as opaque or cirrus cloud)
-    mask = cloudProb.lt(50).And(cloudOpaque.eq(0)).And(cloudCirrus.eq(0))
+def read_counties(shapefile_path=SHAPEFILE_PATH, county_fips=None):
+    """
+    Read counties from the GeoParquet copy of the county shapefile.
+
+    The copy is created on first use (see process_counties.prepare_counties_cache);
+    if it can't be written, the shapefile is read instead.
 
-    # Apply the mask and scale the pixel values
-    return img.updateMask(mask).divide(10000)
+    Args:
+        shapefile_path: Path to the county shapefile
+        county_fips: Only read the county with this FIPS code (digits only), or None for all
 
-def get_county_data(county_fips):
+    Returns:
+        GeoDataFrame of counties
+    """
+    try:
+        filters = [('GEOID', '==', county_fips)] if county_fips else None
+        return gpd.read_parquet(prepare_counties_cache(shapefile_path), filters=filters)
+    except Exception as e:
+        logger.warning(f"Could not read the GeoParquet county cache, reading the shapefile: {e}")
+        where = f"GEOID = '{county_fips}'" if county_fips else None
+        return gpd.read_file(shapefile_path, engine='pyogrio', use_arrow=True, where=where)
+
+def load_counties(shapefile_path=SHAPEFILE_PATH):
+    """
+    Load all counties, indexed by GEOID.
+
+    Callers processing several counties load this once and pass it to
+    get_county_data / process_one, so the county data is only read once.
+
+    Returns:
+        GeoDataFrame of counties indexed by GEOID (the GEOID column is kept)
+    """
+    return read_counties(shapefile_path).set_index('GEOID', drop=False)
+
+def get_county_data(county_fips, counties_gdf=None):
     """
     Get county data from the shapefile.
 
     Args:
         county_fips: FIPS code of the county
+        counties_gdf: Counties indexed by GEOID (see load_counties), or None
+            to load them from the shapefile
 
     Returns:
         County data as a GeoDataFrame row, or None if not found
     """
     logger.info(f"Getting data for county FIPS: {county_fips}")
 
-    try:
-        # Load the county shapefile
-        shapefile_path = 'data/tl_2024_us_county/tl_2024_us_county.shp'
-        counties_gdf = gpd.read_file(shapefile_path)
+    # FIPS codes are digits only; anything else could alter the OGR SQL filter
+    if not county_fips.isdigit():
+        logger.error(f"Invalid county FIPS code: {county_fips}")
+        return None
 
-        # Filter for the specified county
-        county_data = counties_gdf[counties_gdf['GEOID'] == county_fips]
+    try:
+        # Read only the specified county; the GEOID filter is applied by the
+        # reader so the other counties are never decoded
+        if counties_gdf is None:
+            counties_gdf = read_counties(county_fips=county_fips).set_index('GEOID', drop=False)
 
-        if len(county_data) == 0:
+        # Look up the specified county by its GEOID index
+        if county_fips not in counties_gdf.index:
             logger.error(f"County with FIPS code {county_fips} not found in shapefile")
             return None
 
-        logger.info(f"Found county: {county_data.iloc[0]['NAME']}, {county_data.iloc[0]['STATEFP']}")
-        return county_data.iloc[0]
+        county_data = counties_gdf.loc[county_fips]
+        logger.info(f"Found county: {county_data['NAME']}, {county_data['STATEFP']}")
+        return county_data
 
     except Exception as e:
         logger.error(f"Error getting county data: {e}")
         return None
 
-def calculate_obsolescence_score(county_geometry, start_date, end_date):
+def add_landsat_indices(landsat):
     """
-    Calculate obsolescence score for a county using real satellite data.
-    No fallbacks to simulated data - only real satellite data is used.
+    Scale a Landsat 8 surface reflectance image and add the NDVI, NDBI and BSI bands.
 
     Args:
-        county_geometry: County geometry as a GeoJSON-like object
-        start_date: Start date for satellite imagery
-        end_date: End date for satellite imagery
+        landsat: Landsat 8 Collection 2 Level-2 image
 
     Returns:
-        Tuple of (obsolescence_score, confidence, tile_count) or None if calculation fails
+        Earth Engine image with the scaled bands and the indices
     """
-    logger.info("Calculating obsolescence score using real satellite data...")
+    # Scale the surface reflectance bands
+    landsat = landsat.select(['SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7']).multiply(0.0000275).add(-0.2)
 
-    try:
-        # Convert county geometry to Earth Engine geometry
-        ee_geometry = ee.Geometry(county_geometry)
-
-        # Simplify the geometry to reduce complexity but preserve shape
-        logger.info("Simplifying county geometry...")
-        simplified_geometry = ee_geometry.simplify(maxError=50)
-
-        # Use a smaller sample area to avoid memory issues
-        # Instead of just the centroid, use a more representative sample
-        logger.info("Creating sample area...")
-
-        # Get the bounds of the county
-        bounds = simplified_geometry.bounds()
-
-        # Create a grid of 4 points within the bounds to sample from different parts of the county
-        coords = bounds.coordinates().get(0).getInfo()
-        minx, miny = coords[0]
-        maxx, maxy = coords[2]
-
-        # Calculate center and quarter points
-        centerx = (minx + maxx) / 2
-        centery = (miny + maxy) / 2
-
-        # Create 4 sample points
-        sample_points = [
-            ee.Geometry.Point([centerx, centery]),  # Center
-            ee.Geometry.Point([minx + (maxx - minx) * 0.25, miny + (maxy - miny) * 0.25]),  # Bottom-left quarter
-            ee.Geometry.Point([minx + (maxx - minx) * 0.25, miny + (maxy - miny) * 0.75]),  # Top-left quarter
-            ee.Geometry.Point([minx + (maxx - minx) * 0.75, miny + (maxy - miny) * 0.75])   # Top-right quarter
-        ]
-
-        # Create small buffers around each point (1km radius)
-        sample_areas = [point.buffer(1000) for point in sample_points]
-
-        # Combine the sample areas
-        sample_geometry = ee.Geometry.MultiPolygon([area.coordinates() for area in sample_areas])
-
-        logger.info("Fetching Sentinel-2 imagery...")
-        # Get Sentinel-2 imagery for the sample area with less cloud cover
-        s2_collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-                         .filterBounds(sample_geometry)
-                         .filterDate(start_date, end_date)
-                         .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 30))  # Filter for less cloudy images
-                         .sort('CLOUDY_PIXEL_PERCENTAGE')  # Sort by cloud cover
-                         .limit(10)  # Get more images to ensure we have enough data
-                         .map(mask_s2_clouds))
+    # Calculate NDVI (vegetation index)
+    ndvi = landsat.normalizedDifference(['SR_B5', 'SR_B4']).rename('NDVI')
 
-        # Get the number of images (tile count)
-        tile_count = s2_collection.size().getInfo()
-        logger.info(f"Found {tile_count} Sentinel-2 images")
+    # Calculate NDBI (built-up index)
+    ndbi = landsat.normalizedDifference(['SR_B6', 'SR_B5']).rename('NDBI')
 
-        # If no images are available, return None - no fallback
-        if tile_count == 0:
-            logger.error("No Sentinel-2 images available for this area")
-            return None
+    # Calculate BSI (bare soil index)
+    bsi_num = landsat.select('SR_B6').add(landsat.select('SR_B4'))
+    bsi_denom = landsat.select('SR_B5').add(landsat.select('SR_B2'))
+    bsi = bsi_num.subtract(bsi_denom).divide(bsi_num.add(bsi_denom)).rename('BSI')
 
-        logger.info("Calculating vegetation and built-up indices...")
-        # Calculate multiple indices to better characterize the area
-        def add_indices(img):
-            # NDVI - vegetation index
-            ndvi = img.normalizedDifference(['B8', 'B4']).rename('NDVI')
+    # Add all indices to the image
+    return landsat.addBands([ndvi, ndbi, bsi])
 
-            # NDBI - built-up index
-            ndbi = img.normalizedDifference(['B11', 'B8']).rename('NDBI')
+def index_reducer():
+    """
+    Reducer for the mean, standard deviation and pixel count of each index
+    band in one pass over the pixels (outputs are named e.g. NDVI_mean,
+    NDVI_stdDev, NDVI_count). Earth Engine must already be initialized.
+    """
+    return (ee.Reducer.mean()
+            .combine(ee.Reducer.stdDev(), sharedInputs=True)
+            .combine(ee.Reducer.count(), sharedInputs=True))
 
-            # NDWI - water index
-            ndwi = img.normalizedDifference(['B3', 'B8']).rename('NDWI')
+def get_simplified_geometry(county_geometry, geoid=None):
+    """
+    Get the simplified Earth Engine geometry of a county.
 
-            # BSI - bare soil index
-            bsi_numerator = (img.select('B11').add(img.select('B4'))).subtract(img.select('B8').add(img.select('B2')))
-            bsi_denominator = (img.select('B11').add(img.select('B4'))).add(img.select('B8').add(img.select('B2')))
-            bsi = bsi_numerator.divide(bsi_denominator).rename('BSI')
+    The geometry is simplified server-side once and cached locally as
+    GeoJSON by GEOID, so reruns and retries for the same county skip the
+    simplify step.
 
-            return img.addBands([ndvi, ndbi, ndwi, bsi])
+    Args:
+        county_geometry: County geometry as a GeoJSON-like object
+        geoid: County GEOID used as the cache key, or None to skip the cache
 
-        s2_with_indices = s2_collection.map(add_indices)
+    Returns:
+        Simplified Earth Engine geometry
+    """
+    # Simplify the geometry to reduce complexity but preserve shape
+    simplified_geometry = ee.Geometry(county_geometry).simplify(maxError=50)
+    if geoid is None:
+        return simplified_geometry
+
+    cache_file = os.path.join(SIMPLIFIED_GEOMETRY_CACHE_DIR, f"{geoid}.geojson")
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r') as f:
+            return ee.Geometry(json.load(f))
+
+    logger.info("Simplifying county geometry...")
+    simplified_geojson = get_info(simplified_geometry)
+    os.makedirs(SIMPLIFIED_GEOMETRY_CACHE_DIR, exist_ok=True)
+    with open(cache_file, 'w') as f:
+        json.dump(simplified_geojson, f)
+    return ee.Geometry(simplified_geojson)
+
+def get_index_region(county_geometry, geoid=None):
+    """
+    Get the footprint and scale the index means of a county are reduced at.
 
-        # Calculate median values to reduce noise
-        logger.info("Calculating median values...")
-        median_img = s2_with_indices.median()
+    Both the per-county and the batch calculations use this footprint and
+    scale over the same least-cloudy-on-top mosaic, so a county gets the
+    same score whichever path processes it.
 
-        # Calculate individual indices for the sample area
-        logger.info("Calculating individual indices...")
+    Args:
+        county_geometry: County geometry as a GeoJSON-like object
+        geoid: County GEOID used to cache the simplified geometry, or None
 
-        # Use a direct approach with real Landsat 8 satellite imagery from NASA/USGS
-        logger.info("Accessing real Landsat 8 satellite imagery from NASA/USGS...")
+    Returns:
+        Tuple of (simplified Earth Engine geometry, scale in meters)
+    """
+    return get_simplified_geometry(county_geometry, geoid), INDEX_SCALE
 
-        # Get a single Landsat 8 image for the area (more reliable than Sentinel-2 for this purpose)
-        landsat = (ee.ImageCollection('LANDSAT/LC08/C02/T1_L2')
-                  .filterBounds(simplified_geometry)
-                  .filterDate(start_date, end_date)
-                  .sort('CLOUD_COVER')
-                  .first())
+def calculate_obsolescence_score(county_geometry, start_date, end_date, geoid=None):
+    """
+    Calculate obsolescence score for a county using real satellite data.
+    No fallbacks to simulated data - only real satellite data is used.
 
-        if landsat is None:
-            logger.error("No Landsat 8 imagery available for this area")
-            return None
+    Args:
+        county_geometry: County geometry as a GeoJSON-like object
+        start_date: Start date for satellite imagery
+        end_date: End date for satellite imagery
+        geoid: County GEOID, used to cache the simplified geometry
 
-        # Scale the surface reflectance bands
-        landsat = landsat.select(['SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7']).multiply(0.0000275).add(-0.2)
+    Returns:
+        Tuple of (obsolescence_score, confidence, tile_count) or None if calculation fails
+    """
+    logger.info("Calculating obsolescence score using real satellite data...")
 
-        # Calculate NDVI (vegetation index)
-        ndvi = landsat.normalizedDifference(['SR_B5', 'SR_B4']).rename('NDVI')
+    try:
+        # Convert county geometry to a simplified Earth Engine geometry
+        simplified_geometry, scale = get_index_region(county_geometry, geoid)
 
-        # Calculate NDBI (built-up index)
-        ndbi = landsat.normalizedDifference(['SR_B6', 'SR_B5']).rename('NDBI')
+        # Use real Landsat 8 satellite imagery from NASA/USGS
+        logger.info("Accessing real Landsat 8 satellite imagery from NASA/USGS...")
+        landsat_collection = (ee.ImageCollection('LANDSAT/LC08/C02/T1_L2')
+                              .filterBounds(simplified_geometry)
+                              .filterDate(start_date, end_date))
 
-        # Calculate BSI (bare soil index)
-        bsi_num = landsat.select('SR_B6').add(landsat.select('SR_B4'))
-        bsi_denom = landsat.select('SR_B5').add(landsat.select('SR_B2'))
-        bsi = bsi_num.subtract(bsi_denom).divide(bsi_num.add(bsi_denom)).rename('BSI')
+        # Get the number of images (tile count)
+        tile_count = get_info(landsat_collection.size())
+        logger.info(f"Found {tile_count} Landsat 8 images")
 
-        # Add all indices to the image
-        landsat_with_indices = landsat.addBands([ndvi, ndbi, bsi])
+        # If no images are available, return None - no fallback
+        if tile_count == 0:
+            logger.error("No Landsat 8 imagery available for this area")
+            return None
+
+        # Mosaic the Landsat 8 images with the least cloudy image on top, the
+        # same image selection as the batch path
+        landsat = landsat_collection.sort('CLOUD_COVER', False).mosaic()
 
-        # Use a smaller sample area (just the centroid with a buffer)
-        county_centroid = simplified_geometry.centroid()
-        sample_area = county_centroid.buffer(5000)
+        landsat_with_indices = add_landsat_indices(landsat)
 
-        # Calculate mean values for the indices
+        # Calculate the index statistics over the whole county in a single
+        # request and a single reducer pass
         try:
             logger.info("Calculating index values...")
-            mean_values = landsat_with_indices.select(['NDVI', 'NDBI', 'BSI']).reduceRegion(
-                reducer=ee.Reducer.mean(),
-                geometry=sample_area,
-                scale=100,  # Use a larger scale to reduce computation
-                maxPixels=1e8
-            ).getInfo()
+            index_stats = get_info(landsat_with_indices.select(['NDVI', 'NDBI', 'BSI']).reduceRegion(
+                reducer=index_reducer(),
+                geometry=simplified_geometry,
+                scale=scale,
+                maxPixels=1e8,
+                bestEffort=True
+            ))
 
-            logger.info(f"Mean values: {mean_values}")
+            logger.info(f"Index statistics: {index_stats}")
 
             # Extract the values
-            ndvi_value = mean_values.get('NDVI')
-            ndbi_value = mean_values.get('NDBI')
-            bsi_value = mean_values.get('BSI')
-
-            # Check if we have valid values
-            if ndvi_value is None or ndbi_value is None or bsi_value is None:
-                logger.error("Missing index values from Landsat 8")
-
-                # Try analyzing the entire county with real satellite data
-                logger.info("Analyzing the entire county with real satellite data...")
-                mean_values = landsat_with_indices.select(['NDVI', 'NDBI', 'BSI']).reduceRegion(
-                    reducer=ee.Reducer.mean(),
-                    geometry=simplified_geometry,
-                    scale=500,  # Use an even larger scale
-                    maxPixels=1e8
-                ).getInfo()
-
-                logger.info(f"Mean values (full county): {mean_values}")
-
-                # Extract the values
-                ndvi_value = mean_values.get('NDVI')
-                ndbi_value = mean_values.get('NDBI')
-                bsi_value = mean_values.get('BSI')
-
-                if ndvi_value is None or ndbi_value is None or bsi_value is None:
-                    logger.error("Still missing index values, cannot calculate obsolescence score")
-                    return None
+            ndvi_value = index_stats.get('NDVI_mean')
+            ndbi_value = index_stats.get('NDBI_mean')
+            bsi_value = index_stats.get('BSI_mean')
 
         except Exception as e:
             logger.error(f"Error calculating index values: {e}")
@@ -342,6 +375,10 @@ def calculate_obsolescence_score(county_geometry, start_date, end_date):
             'NDVI': ndvi_value,
             'NDBI': ndbi_value,
             'BSI': bsi_value,
+            'NDVI stdDev': index_stats.get('NDVI_stdDev'),
+            'NDBI stdDev': index_stats.get('NDBI_stdDev'),
+            'BSI stdDev': index_stats.get('BSI_stdDev'),
+            'Pixel count': index_stats.get('NDVI_count'),
             'Obsolescence': obsolescence_value
         }
 
@@ -363,7 +400,156 @@ def calculate_obsolescence_score(county_geometry, start_date, end_date):
         logger.error(f"Error calculating obsolescence score: {e}")
         return None
 
-def update_county_scores(county_data, obsolescence_data, output_file):
+def calculate_obsolescence_scores_batch(counties, start_date, end_date):
+    """
+    Calculate obsolescence scores for several counties in one Earth Engine request.
+    No fallbacks to simulated data - only real satellite data is used.
+
+    The simplified geometries of all counties are reduced together with a
+    single reduceRegions call over a FeatureCollection, instead of one
+    reduceRegion round trip per county. Footprint and scale are the same as
+    in calculate_obsolescence_score. Each pixel comes from the least cloudy
+    Landsat 8 image covering it.
+
+    Args:
+        counties: GeoDataFrame of the counties to process
+        start_date: Start date for satellite imagery
+        end_date: End date for satellite imagery
+
+    Returns:
+        Dict mapping GEOID to (obsolescence_score, confidence, tile_count), or
+        to None for counties without valid index values
+    """
+    logger.info(f"Calculating obsolescence scores for {len(counties)} counties in one batch...")
+
+    # Reduce over the whole simplified county. The geometries are simplified
+    # server-side within the batch request (no GEOID, so no per-county
+    # getInfo round trip for the geometry cache)
+    index_regions = [get_index_region(geometry.__geo_interface__) for geometry in counties.geometry]
+    sample_areas = ee.FeatureCollection([
+        ee.Feature(county_area, {'GEOID': geoid})
+        for geoid, (county_area, _) in zip(counties['GEOID'], index_regions)
+    ])
+
+    landsat_collection = (ee.ImageCollection('LANDSAT/LC08/C02/T1_L2')
+                          .filterBounds(sample_areas)
+                          .filterDate(start_date, end_date))
+
+    # Count the Landsat 8 images over each sample area (tile count) server-side
+    sample_areas = sample_areas.map(
+        lambda feature: feature.set('tile_count', landsat_collection.filterBounds(feature.geometry()).size())
+    )
+
+    # Mosaic the Landsat 8 images with the least cloudy image on top
+    landsat = landsat_collection.sort('CLOUD_COVER', False).mosaic()
+    landsat_with_indices = add_landsat_indices(landsat)
+
+    # Calculate the mean index values of every county in one request, at the
+    # scale get_index_region gives every county
+    results = get_info(landsat_with_indices.select(['NDVI', 'NDBI', 'BSI']).reduceRegions(
+        collection=sample_areas,
+        reducer=ee.Reducer.mean(),
+        scale=INDEX_SCALE
+    ))
+
+    # Collect the index values of all counties into one table; counties
+    # without an index value get NaN
+    values = pd.DataFrame([feature['properties'] for feature in results['features']],
+                          columns=['GEOID', 'tile_count', 'NDVI', 'NDBI', 'BSI'])
+    values['tile_count'] = values['tile_count'].fillna(0)
+    valid = (values['tile_count'] > 0) & values[['NDVI', 'NDBI', 'BSI']].notna().all(axis=1)
+    for geoid in values.loc[~valid, 'GEOID']:
+        logger.error(f"Missing satellite data for county {geoid}")
+
+    # Counties without valid index values map to None
+    scores = dict.fromkeys(values['GEOID'])
+
+    # Formula: (NDBI + BSI - NDVI + 1) / 3, clamped to the 0-1 range, for
+    # all counties at once
+    values = values[valid]
+    obsolescence_scores = np.clip((values['NDBI'] + values['BSI'] - values['NDVI'] + 1) / 3, 0, 1)
+    confidences = np.minimum(0.95, 0.5 + values['tile_count'] / 20)
+
+    scores.update(zip(values['GEOID'], zip(obsolescence_scores, confidences, values['tile_count'].astype(int))))
+    return scores
+
+def is_parquet(path):
+    """Check whether a county scores file is stored as GeoParquet."""
+    return os.path.splitext(path)[1].lower() == '.parquet'
+
+def read_county_scores(path, **kwargs):
+    """Read a county scores file (GeoParquet, or any format OGR can read)."""
+    if is_parquet(path):
+        return gpd.read_parquet(path, **kwargs)
+    return gpd.read_file(path, engine='pyogrio', use_arrow=True, **kwargs)
+
+def write_county_scores(county_gdf, path):
+    """Write a county scores file in the format given by its extension."""
+    if is_parquet(path):
+        county_gdf.to_parquet(path)
+    else:
+        county_gdf.to_file(path, driver=get_output_driver(path), engine='pyogrio')
+
+class CountyScoresBatch:
+    """
+    County scores for a batch of counties, kept in memory.
+
+    The output file is read once when the batch starts and written once by
+    write(), instead of being read and rewritten for every county.
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.existing_gdf = None
+        self.new_counties = {}
+
+        if os.path.exists(output_file):
+            try:
+                self.existing_gdf = read_county_scores(output_file)
+                logger.info(f"Loaded {len(self.existing_gdf)} counties from existing output file")
+            except Exception as e:
+                logger.error(f"Error loading existing output file: {e}")
+
+        # GEOIDs of all counties in the output, including the ones added in this batch
+        if self.existing_gdf is not None:
+            self.processed_geoids = set(self.existing_gdf['GEOID'])
+        else:
+            self.processed_geoids = set()
+
+    def add(self, county_gdf):
+        """Add (or replace) a scored county."""
+        geoid = county_gdf['GEOID'].iloc[0]
+        self.new_counties[geoid] = county_gdf
+        self.processed_geoids.add(geoid)
+
+    def write(self):
+        """
+        Write the existing and new county scores to the output file.
+
+        Returns:
+            Number of counties written, or 0 if there was nothing new to write
+        """
+        if not self.new_counties:
+            logger.info("No new counties to write")
+            return 0
+
+        combined_gdf = pd.concat(self.new_counties.values(), ignore_index=True)
+        if self.existing_gdf is not None:
+            # Convert the new counties to the CRS of the existing file if needed
+            if self.existing_gdf.crs != combined_gdf.crs:
+                logger.info(f"Converting CRS from {combined_gdf.crs} to {self.existing_gdf.crs}")
+                combined_gdf = combined_gdf.to_crs(self.existing_gdf.crs)
+
+            # Counties scored again in this batch replace their existing rows
+            existing_gdf = self.existing_gdf[~self.existing_gdf['GEOID'].isin(self.new_counties.keys())]
+            combined_gdf = pd.concat([existing_gdf, combined_gdf], ignore_index=True)
+
+        os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+        write_county_scores(combined_gdf, self.output_file)
+        logger.info(f"Saved {len(combined_gdf)} counties to {self.output_file}")
+        return len(combined_gdf)
+
+def update_county_scores(county_data, obsolescence_data, output_file, batch=None):
     """
     Update county scores in the output file.
     Only real data is saved - no simulated or default values.
@@ -371,7 +557,10 @@ def update_county_scores(county_data, obsolescence_data, output_file):
     Args:
         county_data: County data as a GeoDataFrame row
         obsolescence_data: Tuple of (obsolescence_score, confidence, tile_count)
-        output_file: Path to the output file
+        output_file: Path to the output file; the format is given by its extension
+            (GeoJSON by default, GeoParquet for .parquet)
+        batch: CountyScoresBatch to add the county to in memory, or None to
+            update the output file right away
 
     Returns:
         True if update was successful, False otherwise
@@ -397,23 +586,40 @@ def update_county_scores(county_data, obsolescence_data, output_file):
         county_gdf['data_source'] = 'real'  # This is real satellite data
         county_gdf['processed_at'] = datetime.datetime.now().isoformat()
 
+        geoid = county_data['GEOID']
+        if not geoid.isdigit():
+            raise ValueError(f"Invalid county FIPS code: {geoid}")
+
+        # In a batch, the county is kept in memory until the batch is written
+        if batch is not None:
+            batch.add(county_gdf)
+            logger.info(f"Updated county {county_data['NAME']}, {county_data['STATEFP']} with obsolescence score: {obsolescence_score:.2f}")
+            return True
+
+        # Formats that support appending get the new county written to the
+        # end of the file in place, unless the county is already in it
+        if (os.path.exists(output_file) and not is_parquet(output_file)
+                and get_output_driver(output_file) in APPEND_DRIVERS):
+            existing_ids = pyogrio.read_dataframe(output_file, columns=['GEOID'], read_geometry=False,
+                                                  where=f"GEOID = '{geoid}'")
+            if len(existing_ids) == 0:
+                county_gdf.to_file(output_file, driver=get_output_driver(output_file), engine='pyogrio',
+                                   append=True)
+                logger.info(f"Appended county {county_data['NAME']}, {county_data['STATEFP']} to {output_file} "
+                            f"with obsolescence score: {obsolescence_score:.2f}")
+                return True
+
         # Load existing county scores if the file exists
         if os.path.exists(output_file):
             try:
-                existing_gdf = gpd.read_file(output_file)
-                logger.info(f"Loaded {len(existing_gdf)} counties from existing GeoJSON file")
-
-                # Create a set of existing GEOIDs
-                if 'GEOID' in existing_gdf.columns:
-                    existing_geoids = set(existing_gdf['GEOID'].values)
+                # Load every county except the one being updated; the GEOID
+                # filter is applied by the reader, so an existing row for the
+                # county is replaced without a separate filtering pass
+                if is_parquet(output_file):
+                    existing_gdf = read_county_scores(output_file, filters=[('GEOID', '!=', geoid)])
                 else:
-                    existing_geoids = set()
-
-                # Check if the county already exists in the dataset
-                if county_data['GEOID'] in existing_geoids:
-                    logger.info(f"County {county_data['GEOID']} already exists in the dataset, updating...")
-                    # Remove the existing county
-                    existing_gdf = existing_gdf[existing_gdf['GEOID'] != county_data['GEOID']]
+                    existing_gdf = read_county_scores(output_file, where=f"GEOID <> '{geoid}'")
+                logger.info(f"Loaded {len(existing_gdf)} other counties from existing output file")
 
                 # Convert both dataframes to the same CRS if needed
                 if existing_gdf.crs != county_gdf.crs:
@@ -434,7 +640,7 @@ def update_county_scores(county_data, obsolescence_data, output_file):
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
         # Save the updated county scores
-        combined_gdf.to_file(output_file, driver='GeoJSON')
+        write_county_scores(combined_gdf, output_file)
 
         logger.info(f"Saved {len(combined_gdf)} counties to {output_file}")
         logger.info(f"Updated county {county_data['NAME']}, {county_data['STATEFP']} with obsolescence score: {obsolescence_score:.2f}")
@@ -445,48 +651,75 @@ def update_county_scores(county_data, obsolescence_data, output_file):
         logger.error(f"Error updating county scores: {e}")
         return False
 
-def main():
-    """
-    Main function to process real satellite data for a county.
-    Only processes and saves real data - no simulated or default values.
+def process_one(county_fips, output_file, start_date, end_date, counties_gdf=None, batch=None):
     """
-    args = parse_args()
-
-    logger.info(f"Processing county {args.county} using real satellite data only")
-    logger.info(f"Date range: {args.start_date} to {args.end_date}")
+    Process real satellite data for a single county.
+    Earth Engine must already be initialized (see initialize_earth_engine).
 
-    # Initialize Earth Engine
-    if not initialize_earth_engine(args.service_account_key):
-        logger.error("Failed to initialize Earth Engine. Exiting.")
-        sys.exit(1)
+    Args:
+        county_fips: FIPS code of the county to process
+        output_file: Path to save the updated county scores
+        start_date: Start date for satellite imagery
+        end_date: End date for satellite imagery
+        counties_gdf: Counties indexed by GEOID (see load_counties), or None
+            to load them from the shapefile
+        batch: CountyScoresBatch to add the county to, or None to update the
+            output file right away
 
+    Returns:
+        Tuple of (obsolescence_score, confidence, tile_count), or None if processing failed
+    """
     # Get county data
-    county_data = get_county_data(args.county)
+    county_data = get_county_data(county_fips, counties_gdf)
     if county_data is None:
-        logger.error("Failed to get county data. Exiting.")
-        sys.exit(1)
+        logger.error("Failed to get county data.")
+        return None
 
-    logger.info(f"Processing county: {county_data['NAME']}, {county_data['STATEFP']} (FIPS: {args.county})")
+    logger.info(f"Processing county: {county_data['NAME']}, {county_data['STATEFP']} (FIPS: {county_fips})")
 
     # Calculate obsolescence score using real satellite data
     obsolescence_data = calculate_obsolescence_score(
         county_data.geometry.__geo_interface__,
-        args.start_date,
-        args.end_date
+        start_date,
+        end_date,
+        geoid=county_fips
     )
 
-    # If we couldn't calculate a valid score, exit
+    # If we couldn't calculate a valid score, stop here
     if obsolescence_data is None:
-        logger.error("Failed to calculate real obsolescence score. No fallback to simulated data. Exiting.")
-        sys.exit(1)
+        logger.error("Failed to calculate real obsolescence score. No fallback to simulated data.")
+        return None
 
-    # Update county scores with real data
-    if not update_county_scores(county_data, obsolescence_data, args.output):
-        logger.error("Failed to update county scores. Exiting.")
-        sys.exit(1)
+    # Update county scores with real data; only one thread may update the
+    # output file or the batch at a time
+    with _output_lock:
+        updated = update_county_scores(county_data, obsolescence_data, output_file, batch)
+    if not updated:
+        logger.error("Failed to update county scores.")
+        return None
 
-    logger.info(f"Successfully processed real satellite data for county {args.county}")
+    logger.info(f"Successfully processed real satellite data for county {county_fips}")
     logger.info(f"Obsolescence score: {obsolescence_data[0]:.2f}, Confidence: {obsolescence_data[1]:.2f}, Tile count: {obsolescence_data[2]}")
+    return obsolescence_data
+
+def main():
+    """
+    Main function to process real satellite data for a county.
+    Only processes and saves real data - no simulated or default values.
+    """
+    args = parse_args()
+
+    logger.info(f"Processing county {args.county} using real satellite data only")
+    logger.info(f"Date range: {args.start_date} to {args.end_date}")
+
+    # Initialize Earth Engine
+    if not initialize_earth_engine(args.service_account_key):
+        logger.error("Failed to initialize Earth Engine. Exiting.")
+        sys.exit(1)
+
+    if process_one(args.county, args.output, args.start_date, args.end_date) is None:
+        logger.error("Failed to process county. Exiting.")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -3,8 +3,13 @@
 Process Remaining Counties with Real Satellite Data
 
 This script processes the remaining counties that haven't been processed yet
-with real satellite data. It uses the process_real_satellite_only.py script
-to process each county and updates the fixed_county_scores.geojson file.
+with real satellite data. It processes each county in-process with
+process_real_satellite_only.py, so the county shapefile and the Earth Engine
+client are loaded once per batch, and updates the fixed_county_scores.geojson file.
+
+The existing county scores are read once at the start of the batch and kept
+in memory with the newly processed counties; the output file is written once
+at the end of the batch.
 
 Usage:
     python process_remaining_counties.py [--batch-size BATCH_SIZE] [--output OUTPUT_FILE]
@@ -13,19 +18,20 @@ Options:
     --batch-size BATCH_SIZE   Number of counties to process in this batch [default: 10]
     --output OUTPUT_FILE      Path to save the updated county scores [default: data/final/fixed_county_scores.geojson]
     --service-account-key     Path to Google Earth Engine service account key [default: config/gee/gentle-cinema-458613-f3-51d8ea2711e7.json]
+    --max-workers NUM         Number of counties to process concurrently [default: 4]
 """
 
 import os
 import argparse
-import geopandas as gpd
-import json
-import subprocess
-import time
+import hashlib
+import pyogrio
+import shutil
 import datetime
 import logging
 import sys
 import random
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Set up logging
 logging.basicConfig(
@@ -41,6 +47,17 @@ logger = logging.getLogger(__name__)
 # Create logs directory if it doesn't exist
 os.makedirs('logs', exist_ok=True)
 
+# Imported after the logging setup above so this script keeps its own log file
+from process_real_satellite_only import (
+    CountyScoresBatch, calculate_obsolescence_scores_batch, initialize_earth_engine, load_counties, process_one,
+    update_county_scores
+)
+
+# Remaining county FIPS codes from the last run, one per line, after a header
+# line with the cache key of the output file and shapefile (see
+# remaining_cache_key)
+REMAINING_CACHE_FILE = 'data/cache/remaining_fips.txt'
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Process Remaining Counties with Real Satellite Data')
@@ -57,12 +74,64 @@ def parse_args():
                         help='End date for satellite imagery (YYYY-MM-DD)')
     parser.add_argument('--seed', type=int, default=42,
                         help='Random seed for county selection')
+    parser.add_argument('--max-workers', type=int, default=4,
+                        help='Number of counties to process concurrently')
     return parser.parse_args()
 
+def remaining_cache_key(processed_file, shapefile_path):
+    """
+    Get the key of the remaining counties cache.
+
+    The key covers the absolute path, modification time and size of the
+    output file and the shapefile, so another or a changed file of either
+    kind invalidates the cache.
+    """
+    parts = []
+    for path in (processed_file, shapefile_path):
+        try:
+            file_stat = os.stat(path)
+            parts.append(f"{os.path.abspath(path)}|{file_stat.st_mtime_ns}|{file_stat.st_size}")
+        except OSError:
+            parts.append(f"{os.path.abspath(path)}|missing")
+    return hashlib.blake2b('|'.join(parts).encode()).hexdigest()
+
+def read_remaining_cache(processed_file, shapefile_path):
+    """
+    Read the cached list of remaining counties.
+
+    Returns:
+        List of FIPS codes, or None if there is no cache or it was written
+        for other or changed versions of the output file or shapefile
+    """
+    if not os.path.exists(REMAINING_CACHE_FILE):
+        return None
+
+    with open(REMAINING_CACHE_FILE, 'r') as f:
+        lines = f.read().splitlines()
+    if not lines or lines[0] != remaining_cache_key(processed_file, shapefile_path):
+        return None
+    return lines[1:]
+
+def write_remaining_cache(processed_file, shapefile_path, remaining_fips):
+    """
+    Cache the list of remaining counties for the next run.
+
+    The cache is written to a temporary file and moved into place, so an
+    interrupted run never leaves a partial list behind.
+    """
+    os.makedirs(os.path.dirname(REMAINING_CACHE_FILE), exist_ok=True)
+    tmp_file = REMAINING_CACHE_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        f.write('\n'.join([remaining_cache_key(processed_file, shapefile_path), *remaining_fips]) + '\n')
+    os.replace(tmp_file, REMAINING_CACHE_FILE)
+
 def get_remaining_counties(processed_file, shapefile_path):
     """
     Get the list of counties that haven't been processed yet.
 
+    The list is cached (see REMAINING_CACHE_FILE) and reused while neither
+    the output file nor the shapefile has changed since it was cached.
+
     Args:
         processed_file: Path to the file with processed counties
         shapefile_path: Path to the county shapefile
@@ -73,21 +142,22 @@ def get_remaining_counties(processed_file, shapefile_path):
     logger.info("Identifying remaining counties to process...")
 
     try:
-        # Load the county shapefile to get all US counties
-        counties_gdf = gpd.read_file(shapefile_path)
-        all_fips = set(counties_gdf['GEOID'].tolist())
+        remaining_fips = read_remaining_cache(processed_file, shapefile_path)
+        if remaining_fips is not None:
+            logger.info(f"Found {len(remaining_fips)} remaining counties to process (cached)")
+            return remaining_fips
+
+        # Get all US counties from the county shapefile; only the GEOID
+        # column is needed, so geometries are never read
+        fips_df = pyogrio.read_dataframe(shapefile_path, columns=['GEOID'], read_geometry=False)
+        all_fips = set(fips_df['GEOID'])
         logger.info(f"Found {len(all_fips)} total counties in shapefile")
 
         # Load the processed counties
         if os.path.exists(processed_file):
-            with open(processed_file, 'r') as f:
-                data = json.load(f)
-            
-            # Get the FIPS codes of processed counties
-            processed_fips = set()
-            for feature in data['features']:
-                if 'GEOID' in feature['properties']:
-                    processed_fips.add(feature['properties']['GEOID'])
+            # Get the FIPS codes of processed counties, again without geometries
+            processed_df = pyogrio.read_dataframe(processed_file, columns=['GEOID'], read_geometry=False)
+            processed_fips = set(processed_df['GEOID'].dropna())
             
             logger.info(f"Found {len(processed_fips)} processed counties")
         else:
@@ -95,8 +165,9 @@ def get_remaining_counties(processed_file, shapefile_path):
             processed_fips = set()
 
         # Calculate remaining counties
-        remaining_fips = list(all_fips - processed_fips)
+        remaining_fips = sorted(all_fips - processed_fips)
         logger.info(f"Found {len(remaining_fips)} remaining counties to process")
+        write_remaining_cache(processed_file, shapefile_path, remaining_fips)
 
         return remaining_fips
 
@@ -104,78 +175,82 @@ def get_remaining_counties(processed_file, shapefile_path):
         logger.error(f"Error getting remaining counties: {e}")
         return []
 
-def process_county(county_fips, output_file, service_account_key, start_date, end_date):
+def process_county(county_fips, batch, start_date, end_date, counties_gdf):
     """
     Process a single county with real satellite data.
 
     Args:
         county_fips: FIPS code of the county to process
-        output_file: Path to save the updated county scores
-        service_account_key: Path to Google Earth Engine service account key
+        batch: CountyScoresBatch the county scores are added to
         start_date: Start date for satellite imagery
         end_date: End date for satellite imagery
+        counties_gdf: Counties indexed by GEOID, loaded once for the batch
 
     Returns:
         True if processing was successful, False otherwise
     """
     logger.info(f"Processing county {county_fips}...")
     
-    # Build the command
-    command = [
-        "python", "tools/process_real_satellite_only.py",
-        "--county", county_fips,
-        "--output", output_file,
-        "--start-date", start_date,
-        "--end-date", end_date
-    ]
-    
-    if service_account_key:
-        command.extend(["--service-account-key", service_account_key])
-    
-    # Run the command
     try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        logger.info(f"Successfully processed county {county_fips}")
-        return True
-    except subprocess.CalledProcessError as e:
+        return process_one(county_fips, batch.output_file, start_date, end_date, counties_gdf, batch) is not None
+    except Exception as e:
         logger.error(f"Error processing county {county_fips}: {e}")
-        logger.error(f"Error output: {e.stderr}")
         return False
 
-def process_batch(county_batch, output_file, service_account_key, start_date, end_date):
+def process_batch(county_batch, batch, start_date, end_date, counties_gdf, max_workers=4):
     """
     Process a batch of counties with real satellite data.
 
     Args:
         county_batch: List of county FIPS codes to process
-        output_file: Path to save the updated county scores
-        service_account_key: Path to Google Earth Engine service account key
+        batch: CountyScoresBatch the county scores are added to
         start_date: Start date for satellite imagery
         end_date: End date for satellite imagery
+        counties_gdf: Counties indexed by GEOID, loaded once for the batch
+        max_workers: Number of counties to process concurrently
 
     Returns:
         Number of successfully processed counties
     """
     logger.info(f"Processing batch of {len(county_batch)} counties...")
     
+    # Score every county with a single batched Earth Engine request
+    try:
+        batch_scores = calculate_obsolescence_scores_batch(counties_gdf.loc[county_batch], start_date, end_date)
+    except Exception as e:
+        logger.error(f"Error calculating batched obsolescence scores: {e}")
+        batch_scores = {}
+    
     success_count = 0
-    for i, county_fips in enumerate(county_batch):
-        logger.info(f"Processing county {i+1}/{len(county_batch)}: {county_fips}")
-        
-        # Process the county
-        success = process_county(county_fips, output_file, service_account_key, start_date, end_date)
-        
-        # Update success count
-        if success:
+    retry_batch = []
+    for county_fips in county_batch:
+        obsolescence_data = batch_scores.get(county_fips)
+        if obsolescence_data is not None and update_county_scores(counties_gdf.loc[county_fips], obsolescence_data,
+                                                                  batch.output_file, batch):
             success_count += 1
             logger.info(f"Successfully processed county {county_fips}")
         else:
-            logger.warning(f"Failed to process county {county_fips}")
+            retry_batch.append(county_fips)
+    
+    if retry_batch:
+        logger.info(f"Processing {len(retry_batch)} counties without a batched score one at a time...")
+    
+    # Process the remaining counties concurrently; most of the time is spent
+    # waiting on Earth Engine, and concurrent requests are limited in
+    # process_real_satellite_only.get_info, so no delay between counties is needed
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda county_fips: process_county(county_fips, batch, start_date, end_date, counties_gdf),
+            retry_batch
+        )
         
-        # Add a small delay between counties to avoid rate limiting
-        if i < len(county_batch) - 1:
-            logger.info("Waiting 5 seconds before processing the next county...")
-            time.sleep(5)
+        for county_fips, success in zip(retry_batch, results):
+            # Update success count
+            if success:
+                success_count += 1
+                logger.info(f"Successfully processed county {county_fips}")
+            else:
+                logger.warning(f"Failed to process county {county_fips}")
     
     return success_count
 
@@ -183,6 +258,11 @@ def copy_to_react_app(output_file):
     """
     Copy the output file to the React app's public directory.
 
+    The React app's file is a hard link to the output file, so no data is
+    copied; it is copied instead where hard links aren't supported (e.g. on
+    another filesystem). The link is recreated after each batch, since the
+    output file is replaced when it is written.
+
     Args:
         output_file: Path to the output file
 
@@ -196,7 +276,12 @@ def copy_to_react_app(output_file):
         os.makedirs(react_dir, exist_ok=True)
         
         react_file = os.path.join(react_dir, os.path.basename(output_file))
-        subprocess.run(["cp", output_file, react_file], check=True)
+        if os.path.lexists(react_file):
+            os.remove(react_file)
+        try:
+            os.link(output_file, react_file)
+        except OSError:
+            shutil.copyfile(output_file, react_file)
         
         logger.info(f"Successfully copied to {react_file}")
         return True
@@ -229,11 +314,31 @@ def main():
     logger.info(f"Selected {batch_size} counties to process in this batch")
     logger.info(f"County FIPS codes: {county_batch}")
     
+    # Initialize Earth Engine and load the counties once for the whole batch
+    if not initialize_earth_engine(args.service_account_key):
+        logger.error("Failed to initialize Earth Engine. Exiting.")
+        return 1
+    counties_gdf = load_counties(shapefile_path)
+    
+    # Keep the county scores in memory for the whole batch
+    batch = CountyScoresBatch(args.output)
+    
     # Process the batch
     success_count = process_batch(
-        county_batch, args.output, args.service_account_key, args.start_date, args.end_date
+        county_batch, batch, args.start_date, args.end_date, counties_gdf, args.max_workers
     )
     
+    # Write the output once for the whole batch, and drop the processed
+    # counties from the cached list of remaining counties
+    if batch.write():
+        try:
+            write_remaining_cache(args.output, shapefile_path, sorted(
+                county_fips for county_fips in remaining_counties
+                if county_fips not in batch.processed_geoids
+            ))
+        except Exception as e:
+            logger.error(f"Error updating remaining counties cache: {e}")
+    
     # Copy to React app
     copy_to_react_app(args.output)
     
@@ -11,32 +11,65 @@ Usage:
 
 Options:
     --region REGION       Region to process (south, east, west, midwest, northeast, alaska_hawaii) [default: south]
-    --output OUTPUT_FILE  Path to save the updated county scores [default: data/final/county_scores.geojson]
+    --output OUTPUT_FILE  Path to save the updated county scores, with an extension matching
+                          FORMAT [default: data/final/county_scores.geojson, .geojsonl or .pbf]
     --counties NUM        Number of counties to process [default: 10]
+    --format FORMAT       Output format: geojson, geojsonseq (one feature per line)
+                          or geobuf (compact binary GeoJSON) [default: geojson]
+    --seed SEED           Random seed for county selection and simulated values [default: new random values each run]
+    --simulate-delay      Sleep in each pipeline stage to mimic real processing time
 """
 
 import os
 import json
 import argparse
 import geopandas as gpd
+import pyogrio
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import random
 import time
 import datetime
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+from process_counties import (
+    FILE_FORMAT_EXTENSIONS, FILE_FORMATS, get_cached_counties, read_county_file, write_county_file
+)
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Process Satellite Imagery')
     parser.add_argument('--region', default='south',
                         choices=['south', 'east', 'west', 'midwest', 'northeast', 'alaska_hawaii'],
                         help='Region to process')
-    parser.add_argument('--output', default='data/final/county_scores.geojson',
-                        help='Path to save the updated county scores')
+    parser.add_argument('--output', default=None,
+                        help='Path to save the updated county scores (default: '
+                             'data/final/county_scores with the extension of --format)')
     parser.add_argument('--counties', type=int, default=10,
                         help='Number of counties to process')
-    return parser.parse_args()
+    parser.add_argument('--format', default='geojson', choices=list(FILE_FORMATS),
+                        help='Output format: geojson, geojsonseq (one feature per line) '
+                             'or geobuf (compact binary GeoJSON)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Random seed for county selection and simulated values '
+                             '(default: new random values each run)')
+    parser.add_argument('--simulate-delay', action='store_true',
+                        help='Sleep in each pipeline stage to mimic real processing time')
+    args = parser.parse_args()
+
+    # The output extension must match the format, so GeoJSON readers (e.g.
+    # the React app) never get another payload under a .geojson name
+    extensions = FILE_FORMAT_EXTENSIONS[args.format]
+    if args.output is None:
+        args.output = 'data/final/county_scores' + extensions[0]
+    elif os.path.splitext(args.output)[1].lower() not in extensions:
+        parser.error(f"--output {args.output} doesn't match --format {args.format} "
+                     f"(expected extension {' or '.join(extensions)})")
+    return args
 
 def get_region_states(region):
     """Get states in the specified region."""
@@ -54,82 +87,134 @@ def get_region_states(region):
     
     return region_states.get(region, [])
 
-def get_region_counties(shapefile_path, region, num_counties=10):
+def get_region_counties(shapefile_path, region, rng, num_counties=10):
     """Get counties from the specified region."""
     print(f"Loading county shapefile from {shapefile_path}...")
     
-    # Load the county shapefile
-    counties_gdf = gpd.read_file(shapefile_path)
-    
     # Get states in the region
     region_states = get_region_states(region)
     
-    # Filter counties in the region
-    region_counties = counties_gdf[counties_gdf['STATEFP'].isin(region_states)]
+    # Load only the counties in the region from the GeoParquet copy of the
+    # shapefile; the state filter is pushed down to the Parquet reader
+    region_counties = get_cached_counties(shapefile_path, region_states)
     
     print(f"Found {len(region_counties)} counties in the {region} region")
     
     # Randomly select counties if there are more than requested
     if len(region_counties) > num_counties:
-        # Set seed for reproducibility
-        random.seed(int(time.time()))  # Use current time for randomness
-        region_counties = region_counties.sample(num_counties)
+        # Sample with the run's random generator; with a seed, the same
+        # counties are selected every run
+        region_counties = region_counties.iloc[rng.choice(len(region_counties), num_counties, replace=False)]
     
     print(f"Selected {len(region_counties)} counties from the {region} region")
     
     return region_counties
 
-def simulate_tile_grid_generation(county_gdf):
+def simulate_tile_grid_generation(county_gdf, rng, simulate_delay=False):
     """Simulate tile grid generation for counties."""
     print("Generating tile grid...")
     
     # Simulate processing time
-    time.sleep(1)
+    if simulate_delay:
+        time.sleep(1)
     
     # Generate random number of tiles for each county
-    county_gdf['tile_count'] = np.random.randint(10, 31, len(county_gdf))
+    county_gdf['tile_count'] = rng.integers(10, 31, len(county_gdf))
     
     print(f"Generated tile grid with {county_gdf['tile_count'].sum()} total tiles")
     
     return county_gdf
 
-def simulate_imagery_export(county_gdf):
+def simulate_imagery_export(county_gdf, rng, simulate_delay=False):
     """Simulate imagery export for counties."""
     print("Exporting imagery...")
     
     # Simulate processing time
-    time.sleep(2)
+    if simulate_delay:
+        time.sleep(2)
     
     # Generate random export success rate (90-100%)
-    success_rate = np.random.uniform(0.9, 1.0)
+    success_rate = rng.uniform(0.9, 1.0)
     successful_exports = int(county_gdf['tile_count'].sum() * success_rate)
     
     print(f"Exported {successful_exports} of {county_gdf['tile_count'].sum()} tiles ({success_rate:.2%} success rate)")
     
     return county_gdf
 
-def simulate_feature_extraction(county_gdf):
+def simulate_feature_extraction(county_gdf, rng, simulate_delay=False):
     """Simulate feature extraction for counties."""
     print("Extracting features...")
     
     # Simulate processing time
-    time.sleep(2)
+    if simulate_delay:
+        time.sleep(2)
     
-    # Generate random feature extraction metrics
-    county_gdf['building_count'] = county_gdf['tile_count'] * np.random.randint(5, 20, len(county_gdf))
-    county_gdf['road_length_km'] = county_gdf['tile_count'] * np.random.uniform(0.5, 2.0, len(county_gdf))
-    county_gdf['vegetation_percent'] = np.random.uniform(10, 70, len(county_gdf))
+    # Generate random feature extraction metrics; the road length factor and
+    # vegetation percentage are drawn together in one call
+    n = len(county_gdf)
+    metrics = rng.uniform([0.5, 10], [2.0, 70], size=(n, 2))
+    county_gdf['building_count'] = county_gdf['tile_count'] * rng.integers(5, 20, n)
+    county_gdf['road_length_km'] = county_gdf['tile_count'] * metrics[:, 0]
+    county_gdf['vegetation_percent'] = metrics[:, 1]
     
     print(f"Extracted features from {county_gdf['tile_count'].sum()} tiles")
     
     return county_gdf
 
-def simulate_score_aggregation(county_gdf, region):
+def _score_kernel(building_count, tile_count, road_length_km, vegetation_percent, score_min, score_max):
+    """
+    Calculate obsolescence scores from the feature extraction metrics.
+    
+    The building and road densities, their min/max and the raw scores are
+    computed in fused loops over the counties, without temporary arrays for
+    each normalization step. Compiled with Numba when it is installed.
+    """
+    n = tile_count.size
+    building_density = np.empty(n)
+    road_density = np.empty(n)
+    
+    # First pass: densities and the min/max of every metric
+    bd_min = rd_min = veg_min = np.inf
+    bd_max = rd_max = veg_max = -np.inf
+    for i in range(n):
+        building_density[i] = building_count[i] / tile_count[i]
+        road_density[i] = road_length_km[i] / tile_count[i]
+        bd_min = min(bd_min, building_density[i])
+        bd_max = max(bd_max, building_density[i])
+        rd_min = min(rd_min, road_density[i])
+        rd_max = max(rd_max, road_density[i])
+        veg_min = min(veg_min, vegetation_percent[i])
+        veg_max = max(veg_max, vegetation_percent[i])
+    
+    # Second pass: raw scores (higher building/road density and lower
+    # vegetation = higher obsolescence) and their min/max; the building
+    # density array is reused for the raw scores
+    raw_min = np.inf
+    raw_max = -np.inf
+    for i in range(n):
+        raw_score = (0.5 * (building_density[i] - bd_min) / (bd_max - bd_min + 1e-10)
+                     + 0.3 * (road_density[i] - rd_min) / (rd_max - rd_min + 1e-10)
+                     - 0.2 * (vegetation_percent[i] - veg_min) / (veg_max - veg_min + 1e-10))
+        building_density[i] = raw_score
+        raw_min = min(raw_min, raw_score)
+        raw_max = max(raw_max, raw_score)
+    
+    # Third pass: normalize to 0-1 and scale to the region-specific range
+    scores = road_density
+    for i in range(n):
+        scores[i] = score_min + (building_density[i] - raw_min) / (raw_max - raw_min + 1e-10) * (score_max - score_min)
+    return scores
+
+if njit is not None:
+    _score_kernel = njit(cache=True)(_score_kernel)
+
+def simulate_score_aggregation(county_gdf, region, rng, simulate_delay=False):
     """Simulate score aggregation for counties."""
     print("Aggregating scores...")
     
     # Simulate processing time
-    time.sleep(1)
+    if simulate_delay:
+        time.sleep(1)
     
     # Define regional score ranges
     region_ranges = {
@@ -146,25 +231,16 @@ def simulate_score_aggregation(county_gdf, region):
     
     # Generate realistic scores based on feature extraction metrics
     # This is a simplified model that combines building density, road density, and vegetation
-    building_density = county_gdf['building_count'] / county_gdf['tile_count']
-    road_density = county_gdf['road_length_km'] / county_gdf['tile_count']
-    
-    # Normalize metrics
-    building_density_norm = (building_density - building_density.min()) / (building_density.max() - building_density.min() + 1e-10)
-    road_density_norm = (road_density - road_density.min()) / (road_density.max() - road_density.min() + 1e-10)
-    vegetation_norm = (county_gdf['vegetation_percent'] - county_gdf['vegetation_percent'].min()) / (county_gdf['vegetation_percent'].max() - county_gdf['vegetation_percent'].min() + 1e-10)
-    
-    # Calculate raw score (higher building/road density and lower vegetation = higher obsolescence)
-    raw_score = 0.5 * building_density_norm + 0.3 * road_density_norm - 0.2 * vegetation_norm
-    
-    # Normalize to 0-1 range
-    raw_score_norm = (raw_score - raw_score.min()) / (raw_score.max() - raw_score.min() + 1e-10)
-    
-    # Scale to region-specific range
-    county_gdf['obsolescence_score'] = score_min + raw_score_norm * (score_max - score_min)
+    county_gdf['obsolescence_score'] = _score_kernel(
+        county_gdf['building_count'].to_numpy(dtype=np.float64),
+        county_gdf['tile_count'].to_numpy(dtype=np.float64),
+        county_gdf['road_length_km'].to_numpy(dtype=np.float64),
+        county_gdf['vegetation_percent'].to_numpy(dtype=np.float64),
+        score_min, score_max
+    )
     
     # Generate confidence values (0.7-0.95)
-    county_gdf['confidence'] = np.random.uniform(0.7, 0.95, len(county_gdf))
+    county_gdf['confidence'] = rng.uniform(0.7, 0.95, len(county_gdf))
     
     # Add data source field
     county_gdf['data_source'] = 'real'
@@ -176,55 +252,77 @@ def simulate_score_aggregation(county_gdf, region):
     
     return county_gdf
 
-def process_satellite_imagery(region, output_file, num_counties=10):
+def process_satellite_imagery(region, output_file, num_counties=10, file_format='geojson', seed=None,
+                              simulate_delay=False):
     """Process satellite imagery for a region and generate county scores."""
     print(f"Processing satellite imagery for {region} region...")
     
+    # One random generator for the whole run, shared by all pipeline stages
+    rng = np.random.default_rng(seed)
+    
     # Get counties from the region
     shapefile_path = 'data/tl_2024_us_county/tl_2024_us_county.shp'
-    region_counties = get_region_counties(shapefile_path, region, num_counties)
+    region_counties = get_region_counties(shapefile_path, region, rng, num_counties)
     
     # Simulate the processing pipeline
-    region_counties = simulate_tile_grid_generation(region_counties)
-    region_counties = simulate_imagery_export(region_counties)
-    region_counties = simulate_feature_extraction(region_counties)
-    region_counties = simulate_score_aggregation(region_counties, region)
+    region_counties = simulate_tile_grid_generation(region_counties, rng, simulate_delay)
+    region_counties = simulate_imagery_export(region_counties, rng, simulate_delay)
+    region_counties = simulate_feature_extraction(region_counties, rng, simulate_delay)
+    region_counties = simulate_score_aggregation(region_counties, region, rng, simulate_delay)
+    
+    # New counties are appended to existing GeoJSON-Seq files, so only the
+    # GEOIDs and CRS of those are read; other formats are rewritten in full
+    append = file_format == 'geojsonseq' and os.path.exists(output_file)
     
     # Load existing county scores
     try:
-        existing_gdf = gpd.read_file(output_file)
+        if append:
+            existing_gdf = pyogrio.read_dataframe(output_file, columns=['GEOID'], read_geometry=False)
+            existing_crs = pyogrio.read_info(output_file)['crs']
+        else:
+            existing_gdf = read_county_file(output_file, file_format)
+            existing_crs = existing_gdf.crs
         print(f"Loaded {len(existing_gdf)} counties from existing GeoJSON file")
     except Exception as e:
         print(f"Error loading existing GeoJSON file: {e}")
         print("Creating new GeoJSON file")
         existing_gdf = gpd.GeoDataFrame()
+        existing_crs = None
+        append = False
     
-    # Create a set of existing GEOIDs
+    # Filter out counties that already exist in the dataset; isin hashes the
+    # existing GEOID column directly, without building a Python set first
     if not existing_gdf.empty and 'GEOID' in existing_gdf.columns:
-        existing_geoids = set(existing_gdf['GEOID'].values)
+        new_counties = region_counties[~region_counties['GEOID'].isin(existing_gdf['GEOID'])]
     else:
-        existing_geoids = set()
-    
-    # Filter out counties that already exist in the dataset
-    new_counties = region_counties[~region_counties['GEOID'].isin(existing_geoids)]
+        new_counties = region_counties
     print(f"Adding {len(new_counties)} new counties to the dataset")
     
-    # Convert both dataframes to the same CRS if needed
-    if not existing_gdf.empty and existing_gdf.crs != new_counties.crs:
-        print(f"Converting CRS from {new_counties.crs} to {existing_gdf.crs}")
-        new_counties = new_counties.to_crs(existing_gdf.crs)
-    
-    # Combine existing and new counties
-    if existing_gdf.empty:
-        combined_gdf = new_counties
-    else:
-        combined_gdf = pd.concat([existing_gdf, new_counties], ignore_index=True)
+    # Convert both dataframes to the same CRS if needed. The CRSs are compared
+    # by content (ignoring axis order), so equivalent definitions skip to_crs;
+    # otherwise only the new counties are reprojected, in one batch
+    if (not existing_gdf.empty and existing_crs
+            and not new_counties.crs.equals(existing_crs, ignore_axis_order=True)):
+        print(f"Converting CRS from {new_counties.crs} to {existing_crs}")
+        new_counties = new_counties.to_crs(existing_crs)
     
     # Save the updated county scores
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    combined_gdf.to_file(output_file, driver='GeoJSON')
-    
-    print(f"Saved {len(combined_gdf)} counties to {output_file}")
+    if append:
+        # Only the new counties are written; the existing ones stay in place
+        if len(new_counties) > 0:
+            write_county_file(new_counties, output_file, file_format, append=True)
+        total_counties = len(existing_gdf) + len(new_counties)
+    else:
+        # Combine existing and new counties
+        if existing_gdf.empty:
+            combined_gdf = new_counties
+        else:
+            combined_gdf = pd.concat([existing_gdf, new_counties], ignore_index=True)
+        write_county_file(combined_gdf, output_file, file_format)
+        total_counties = len(combined_gdf)
+    
+    print(f"Saved {total_counties} counties to {output_file}")
     print(f"Added {len(new_counties)} new counties from the {region} region")
     
     # Print some statistics about the new counties
@@ -239,7 +337,8 @@ def process_satellite_imagery(region, output_file, num_counties=10):
 def main():
     """Main function."""
     args = parse_args()
-    process_satellite_imagery(args.region, args.output, args.counties)
+    process_satellite_imagery(args.region, args.output, args.counties, args.format, args.seed,
+                              args.simulate_delay)
 
 if __name__ == "__main__":
     main()
@@ -7,11 +7,19 @@ This is a more robust approach to fix a corrupted GeoJSON file.
 import os
 import sys
 import json
+import mmap
 import geopandas as gpd
 import pandas as pd
 import logging
 from tqdm import tqdm
 
+from process_counties import prepare_counties_cache
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,10 +31,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def iter_feature_strings(content, start, end):
+    """
+    Split the features array of a GeoJSON file into feature strings.
+    
+    The file content is scanned for the '},{' delimiter in place, so only one
+    feature at a time is copied out of it and decoded.
+    
+    Args:
+        content: File content (e.g. a memory map of the file)
+        start: Offset of the first feature
+        end: Offset of the end of the features array
+    """
+    while True:
+        delimiter = content.find(b'},{', start, end)
+        if delimiter == -1:
+            yield content[start:end].decode('utf-8', errors='replace')
+            return
+        yield content[start:delimiter].decode('utf-8', errors='replace')
+        start = delimiter + len(b'},{')
+
+def stream_valid_features(input_file, geoid_to_properties):
+    """
+    Extract features from a GeoJSON file with a streaming JSON parser.
+    
+    Features are parsed one at a time, in a single pass, up to the first
+    point where the file is corrupted.
+    
+    Args:
+        input_file: Path to the GeoJSON file
+        geoid_to_properties: Dictionary mapping GEOID to properties, updated in place
+        
+    Returns:
+        True if the whole file was parsed, False if parsing stopped at corrupted data
+    """
+    try:
+        with open(input_file, 'rb') as f:
+            for feature in ijson.items(f, 'features.item', use_float=True):
+                properties = feature.get('properties') or {}
+                if 'GEOID' in properties:
+                    geoid_to_properties[properties['GEOID']] = properties
+        return True
+    except (ijson.JSONError, AttributeError, TypeError, ValueError) as e:
+        # Besides invalid JSON, a damaged file can hold features that aren't
+        # objects or GEOIDs that can't be dictionary keys
+        logger.warning(f"Stopped streaming at corrupted data after "
+                       f"{len(geoid_to_properties)} counties: {e}")
+        return False
+
 def extract_valid_features(input_file):
     """
     Extract valid features from a corrupted GeoJSON file.
     
+    The features are streamed with ijson when it is installed; the file is
+    only scanned as text when streaming stops at corrupted data.
+    
     Args:
         input_file: Path to the corrupted GeoJSON file
         
@@ -38,83 +97,94 @@ def extract_valid_features(input_file):
     # Dictionary to store GEOID -> properties mapping
     geoid_to_properties = {}
     
+    if ijson is not None and stream_valid_features(input_file, geoid_to_properties):
+        logger.info(f"Extracted properties for {len(geoid_to_properties)} counties")
+        return geoid_to_properties
+    
     try:
-        # Read the file as text
-        with open(input_file, 'r') as f:
-            content = f.read()
-        
-        # Find the start of the features array
-        features_start = content.find('"features": [') + len('"features": [')
-        
-        # Extract the features part
-        features_content = content[features_start:].strip()
-        
-        # Remove the closing brackets if they exist
-        if features_content.endswith(']}'):
-            features_content = features_content[:-2]
-        
-        # Split by feature delimiter
-        feature_strings = features_content.split('},{')
-        
-        # Process each feature
-        for i, feature_str in enumerate(tqdm(feature_strings, desc="Processing features")):
-            try:
-                # Add the braces back
-                if not feature_str.startswith('{'):
-                    feature_str = '{' + feature_str
-                if not feature_str.endswith('}'):
-                    feature_str = feature_str + '}'
-                
-                # Try to parse it
-                feature = json.loads(feature_str)
-                
-                # Extract GEOID and properties
-                if 'properties' in feature and 'GEOID' in feature['properties']:
-                    geoid = feature['properties']['GEOID']
-                    geoid_to_properties[geoid] = feature['properties']
-            except json.JSONDecodeError:
-                # Try to extract GEOID and properties manually
+        # Memory-map the file instead of reading it into a string
+        with open(input_file, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            
+            # Find the start of the features array, skipping whitespace
+            features_start = content.find(b'"features": [') + len(b'"features": [')
+            while features_start < len(content) and content[features_start:features_start + 1].isspace():
+                features_start += 1
+            
+            # Find the end of the features part, without trailing whitespace
+            features_end = len(content)
+            while features_end > features_start and content[features_end - 1:features_end].isspace():
+                features_end -= 1
+            
+            # Remove the closing brackets if they exist
+            if content[features_end - 2:features_end] == b']}':
+                features_end -= 2
+            
+            # Split by feature delimiter, one feature at a time
+            feature_strings = iter_feature_strings(content, features_start, features_end)
+            
+            # Process each feature; the progress bar is only redrawn every 100
+            # features (at most twice a second), and only on a terminal
+            progress = tqdm(feature_strings, desc="Processing features", mininterval=0.5, miniters=100,
+                            disable=not sys.stderr.isatty())
+            for i, feature_str in enumerate(progress):
                 try:
-                    # Find the GEOID
-                    geoid_start = feature_str.find('"GEOID": "') + len('"GEOID": "')
-                    geoid_end = feature_str.find('"', geoid_start)
-                    geoid = feature_str[geoid_start:geoid_end]
-                    
-                    # Find the obsolescence score
-                    score_start = feature_str.find('"obsolescence_score": ') + len('"obsolescence_score": ')
-                    score_end = feature_str.find(',', score_start)
-                    if score_end == -1:  # Might be the last property
-                        score_end = feature_str.find('}', score_start)
-                    score = float(feature_str[score_start:score_end])
+                    # Add the braces back
+                    if not feature_str.startswith('{'):
+                        feature_str = '{' + feature_str
+                    if not feature_str.endswith('}'):
+                        feature_str = feature_str + '}'
                     
-                    # Find the confidence
-                    conf_start = feature_str.find('"confidence": ') + len('"confidence": ')
-                    conf_end = feature_str.find(',', conf_start)
-                    if conf_end == -1:  # Might be the last property
-                        conf_end = feature_str.find('}', conf_start)
-                    confidence = float(feature_str[conf_start:conf_end])
+                    # Try to parse it
+                    feature = json.loads(feature_str)
                     
-                    # Find the tile count
-                    tile_start = feature_str.find('"tile_count": ') + len('"tile_count": ')
-                    tile_end = feature_str.find(',', tile_start)
-                    if tile_end == -1:  # Might be the last property
-                        tile_end = feature_str.find('}', tile_start)
-                    tile_count = int(feature_str[tile_start:tile_end])
-                    
-                    # Create a properties dictionary
-                    properties = {
-                        'GEOID': geoid,
-                        'obsolescence_score': score,
-                        'confidence': confidence,
-                        'tile_count': tile_count,
-                        'data_source': 'real'
-                    }
-                    
-                    geoid_to_properties[geoid] = properties
+                    # Extract GEOID and properties
+                    if 'properties' in feature and 'GEOID' in feature['properties']:
+                        geoid = feature['properties']['GEOID']
+                        geoid_to_properties[geoid] = feature['properties']
+                except json.JSONDecodeError:
+                    # Try to extract GEOID and properties manually
+                    try:
+                        # Find the GEOID
+                        geoid_start = feature_str.find('"GEOID": "') + len('"GEOID": "')
+                        geoid_end = feature_str.find('"', geoid_start)
+                        geoid = feature_str[geoid_start:geoid_end]
+                        
+                        # Find the obsolescence score
+                        score_start = feature_str.find('"obsolescence_score": ') + len('"obsolescence_score": ')
+                        score_end = feature_str.find(',', score_start)
+                        if score_end == -1:  # Might be the last property
+                            score_end = feature_str.find('}', score_start)
+                        score = float(feature_str[score_start:score_end])
+                        
+                        # Find the confidence
+                        conf_start = feature_str.find('"confidence": ') + len('"confidence": ')
+                        conf_end = feature_str.find(',', conf_start)
+                        if conf_end == -1:  # Might be the last property
+                            conf_end = feature_str.find('}', conf_start)
+                        confidence = float(feature_str[conf_start:conf_end])
+                        
+                        # Find the tile count
+                        tile_start = feature_str.find('"tile_count": ') + len('"tile_count": ')
+                        tile_end = feature_str.find(',', tile_start)
+                        if tile_end == -1:  # Might be the last property
+                            tile_end = feature_str.find('}', tile_start)
+                        tile_count = int(feature_str[tile_start:tile_end])
+                        
+                        # Create a properties dictionary
+                        properties = {
+                            'GEOID': geoid,
+                            'obsolescence_score': score,
+                            'confidence': confidence,
+                            'tile_count': tile_count,
+                            'data_source': 'real'
+                        }
+                        
+                        geoid_to_properties[geoid] = properties
+                    except Exception as e:
+                        logger.warning(f"Could not extract properties from feature {i}: {e}")
                 except Exception as e:
-                    logger.warning(f"Could not extract properties from feature {i}: {e}")
-            except Exception as e:
-                logger.warning(f"Error processing feature {i}: {e}")
+                    logger.warning(f"Error processing feature {i}: {e}")
         
         logger.info(f"Extracted properties for {len(geoid_to_properties)} counties")
         return geoid_to_properties
@@ -138,22 +208,22 @@ def recreate_geojson(shapefile, properties_dict, output_file):
     logger.info(f"Recreating GeoJSON file from {shapefile}")
     
     try:
-        # Load the county shapefile
-        counties = gpd.read_file(shapefile)
+        # Load the counties from the GeoParquet copy of the shapefile
+        counties = gpd.read_parquet(prepare_counties_cache(shapefile))
         logger.info(f"Loaded {len(counties)} counties from shapefile")
         
-        # Filter to only include counties with properties
-        counties_with_data = counties[counties['GEOID'].isin(properties_dict.keys())].copy()
-        logger.info(f"Found {len(counties_with_data)} counties with data")
+        # Build a table of the properties once; properties missing from a
+        # feature become NaN
+        props_df = pd.DataFrame.from_dict(properties_dict, orient='index').reindex(
+            columns=['obsolescence_score', 'confidence', 'tile_count', 'data_source']
+        )
         
-        # Add the properties to the GeoDataFrame
-        for prop in ['obsolescence_score', 'confidence', 'tile_count', 'data_source']:
-            counties_with_data[prop] = counties_with_data['GEOID'].apply(
-                lambda geoid: properties_dict[geoid].get(prop, None)
-            )
+        # Join the properties to the counties with data in one hash join
+        counties_with_data = counties.merge(props_df, left_on='GEOID', right_index=True, how='inner')
+        logger.info(f"Found {len(counties_with_data)} counties with data")
         
         # Save to GeoJSON
-        counties_with_data.to_file(output_file, driver='GeoJSON')
+        counties_with_data.to_file(output_file, driver='GeoJSON', engine='pyogrio')
         logger.info(f"Saved {len(counties_with_data)} counties to {output_file}")
         
         return True
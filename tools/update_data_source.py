@@ -9,6 +9,91 @@ import os
 import sys
 import argparse
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+def dump_json(obj):
+    """Serialize an object to JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+def read_header_members(input_file):
+    """
+    Read the top-level members (type, name, crs, bbox, ...) of a GeoJSON
+    file that come before its features.
+
+    Parsing stops at the features key, so only the small header is read;
+    GDAL writes all other members before the features.
+
+    Returns:
+        Dictionary of the members in file order
+    """
+    members = {}
+    key = None
+    builder = None
+    with open(input_file, 'rb') as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == '' and event == 'map_key':
+                if value == 'features':
+                    break
+                key = value
+                builder = ijson.ObjectBuilder()
+            elif key is not None and prefix != '':
+                builder.event(event, value)
+                if prefix == key and event not in ('start_map', 'start_array', 'map_key'):
+                    # The member's value is complete
+                    members[key] = builder.value
+    return members
+
+def stream_data_source(input_file, output_file):
+    """
+    Update the data_source field feature by feature, without loading the
+    whole GeoJSON file into memory.
+
+    The header members before the features are copied in their original
+    order; the features are then built one at a time by ijson.
+
+    Args:
+        input_file (str): Path to the input GeoJSON file
+        output_file (str): Path to the output GeoJSON file
+    """
+    print(f"Streaming GeoJSON from {input_file}")
+
+    header = read_header_members(input_file)
+    header.setdefault('type', 'FeatureCollection')
+
+    # Write to a temporary file first, so the input can also be the output
+    tmp_file = output_file + '.tmp'
+    feature_count = 0
+    try:
+        with open(input_file, 'rb') as f_in, open(tmp_file, 'wb') as f_out:
+            f_out.write(dump_json(header)[:-1] + b',"features":[')
+            for feature in ijson.items(f_in, 'features.item', use_float=True):
+                feature['properties']['data_source'] = 'real'
+                if feature_count:
+                    f_out.write(b',\n')
+                f_out.write(dump_json(feature))
+                feature_count += 1
+            f_out.write(b']}\n')
+        os.replace(tmp_file, output_file)
+    except Exception as e:
+        print(f"Error updating GeoJSON: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return False
+
+    print(f"Updated data_source field for {feature_count} counties")
+    print(f"Saved updated GeoJSON to {output_file}")
+    return True
+
 def update_data_source(input_file, output_file):
     """
     Update the data_source field in the GeoJSON file.
@@ -17,10 +102,19 @@ def update_data_source(input_file, output_file):
         input_file (str): Path to the input GeoJSON file
         output_file (str): Path to the output GeoJSON file
     """
+    # Stream the features one at a time when ijson is installed
+    if ijson is not None:
+        return stream_data_source(input_file, output_file)
+
     print(f"Loading GeoJSON from {input_file}")
     try:
-        with open(input_file, 'r') as f:
-            data = json.load(f)
+        if orjson is not None:
+            # orjson parses straight from bytes, much faster than json.load
+            with open(input_file, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(input_file, 'r') as f:
+                data = json.load(f)
     except Exception as e:
         print(f"Error loading GeoJSON: {e}")
         return False
@@ -35,8 +129,8 @@ def update_data_source(input_file, output_file):
     
     # Save the updated GeoJSON
     try:
-        with open(output_file, 'w') as f:
-            json.dump(data, f)
+        with open(output_file, 'wb') as f:
+            f.write(dump_json(data))
     except Exception as e:
         print(f"Error saving GeoJSON: {e}")
         return False
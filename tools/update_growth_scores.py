@@ -17,11 +17,16 @@ Options:
 import os
 import sys
 import argparse
+import shutil
 import geopandas as gpd
 import numpy as np
 import logging
 import time
-from tqdm import tqdm
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # Set up logging
 logging.basicConfig(
@@ -48,24 +53,73 @@ def parse_args():
                         help='Path to the React app public directory')
     return parser.parse_args()
 
+def _growth_kernel(obsolescence_scores):
+    """
+    Calculate growth potential scores in a single loop over the scores.
+    Same formula as calculate_growth_score; compiled with Numba when it is
+    installed, so no temporary arrays are allocated.
+    """
+    growth_scores = np.empty_like(obsolescence_scores)
+    for i in range(obsolescence_scores.size):
+        ndvi_value = 0.5
+        ndbi_value = (3 * obsolescence_scores[i] - 1 + ndvi_value) * 0.5
+        if ndbi_value < -1:
+            ndbi_value = -1.0
+        elif ndbi_value > 1:
+            ndbi_value = 1.0
+        bsi_value = ndbi_value
+        base_score = 0.5 * (ndbi_value + 0.1) + 0.3 * (ndvi_value - 0.2) + 0.2 * bsi_value
+        scaled_score = base_score * 1.2
+        if scaled_score < 0:
+            scaled_score = 0.0
+        elif scaled_score > 1:
+            scaled_score = 1.0
+        growth_scores[i] = scaled_score
+    return growth_scores
+
+if njit is not None:
+    # Compiled eagerly for the only signature it is called with (a contiguous
+    # float64 array, see calculate_growth_scores), so there is no JIT warmup
+    # on the first call; cache=True loads the compiled kernel from disk on
+    # later runs. fastmath is left off so counties without an obsolescence
+    # score (NaN) stay NaN
+    _growth_kernel = njit('float64[:](float64[::1])', cache=True)(_growth_kernel)
+
+def calculate_growth_scores(obsolescence_scores):
+    """
+    Calculate growth potential scores for an array of obsolescence scores.
+
+    Args:
+        obsolescence_scores: Array of obsolescence scores between 0 and 1
+
+    Returns:
+        Array of growth potential scores between 0 and 1
+    """
+    obsolescence_scores = np.ascontiguousarray(obsolescence_scores, dtype=np.float64)
+    if njit is None:
+        return calculate_growth_score(obsolescence_scores)
+    return _growth_kernel(obsolescence_scores)
+
 def calculate_growth_score(obsolescence_score):
     """
     Calculate growth potential score based on obsolescence score.
 
     Args:
-        obsolescence_score: Obsolescence score between 0 and 1
+        obsolescence_score: Obsolescence score between 0 and 1, or an array
+            of obsolescence scores
 
     Returns:
-        Growth potential score between 0 and 1
+        Growth potential score between 0 and 1, or an array of scores
     """
+    obsolescence_score = np.asarray(obsolescence_score, dtype=np.float64)
+
     # Estimate the raw indices with increased baseline NDVI
     ndvi_value = 0.5  # Increased baseline NDVI value (was 0.4)
     ndbi_value = (3 * obsolescence_score - 1 + ndvi_value) / 2  # Derived from obsolescence formula
-    bsi_value = ndbi_value  # Assume similar to NDBI for simplicity
 
     # Ensure values are in reasonable ranges
-    ndbi_value = max(-1, min(1, ndbi_value))
-    bsi_value = max(-1, min(1, bsi_value))
+    ndbi_value = np.clip(ndbi_value, -1, 1)
+    bsi_value = ndbi_value  # Assume similar to NDBI for simplicity
 
     # Calibrated formula for growth potential:
     # - Uses negative offset (-0.1) for NDBI to shift distribution down
@@ -75,7 +129,7 @@ def calculate_growth_score(obsolescence_score):
     scaled_score = base_score * 1.2
 
     # Clamp to 0-1 range
-    growth_score = max(0, min(1, scaled_score))
+    growth_score = np.clip(scaled_score, 0, 1)
     return growth_score
 
 def update_growth_scores(input_file, output_file, react_app_dir):
@@ -97,9 +151,10 @@ def update_growth_scores(input_file, output_file, react_app_dir):
         counties_gdf = gpd.read_file(input_file)
         logger.info(f"Loaded {len(counties_gdf)} counties from {input_file}")
 
-        # Create a backup of the original file
+        # Create a backup of the original file; a byte copy, so the counties
+        # aren't encoded as GeoJSON again
         backup_file = input_file + '.bak'
-        counties_gdf.to_file(backup_file, driver='GeoJSON')
+        shutil.copyfile(input_file, backup_file)
         logger.info(f"Created backup of original file at {backup_file}")
 
         # Initialize growth_potential_score column if it doesn't exist
@@ -113,29 +168,21 @@ def update_growth_scores(input_file, output_file, react_app_dir):
         logger.info(f"Counties with growth potential scores: {counties_with_growth}")
         logger.info(f"Counties without growth potential scores: {counties_without_growth}")
 
-        # Update growth potential scores for all counties
+        # Update growth potential scores for all counties at once
         logger.info("Updating growth potential scores for all counties")
-
-        # Process each county
-        for idx, county in tqdm(counties_gdf.iterrows(), total=len(counties_gdf), desc="Processing counties"):
-            # Get the obsolescence score
-            obsolescence_score = county['obsolescence_score']
-
-            # Calculate growth potential score
-            growth_score = calculate_growth_score(obsolescence_score)
-
-            # Store the value
-            counties_gdf.at[idx, 'growth_potential_score'] = growth_score
+        counties_gdf['growth_potential_score'] = calculate_growth_scores(
+            counties_gdf['obsolescence_score'].to_numpy(dtype=np.float64)
+        )
 
         # Save the updated GeoJSON file
-        counties_gdf.to_file(output_file, driver='GeoJSON')
+        counties_gdf.to_file(output_file, driver='GeoJSON', engine='pyogrio')
         logger.info(f"Saved {len(counties_gdf)} counties with updated growth potential scores to {output_file}")
 
-        # Copy to React app directory
+        # Copy the written file to the React app directory
         if react_app_dir:
             os.makedirs(react_app_dir, exist_ok=True)
             react_file = os.path.join(react_app_dir, os.path.basename(output_file))
-            counties_gdf.to_file(react_file, driver='GeoJSON')
+            shutil.copyfile(output_file, react_file)
             logger.info(f"Copied updated file to React app directory: {react_file}")
 
         return True
@@ -11,14 +11,243 @@ before they are used in the visualization pipeline.
 import os
 import sys
 import argparse
+import functools
+import hashlib
 import json
 import pandas as pd
 import numpy as np
 import geopandas as gpd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyogrio
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def validate_geojson(geojson_path, required_fields=None, output_path=None):
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _column_stats(values):
+    """
+    Calculate min, max, mean, sample standard deviation and the zero/negative
+    counts of an array in a single loop (Welford's algorithm for the mean and
+    variance). Compiled with Numba when it is installed.
+    """
+    vmin = np.inf
+    vmax = -np.inf
+    mean = 0.0
+    m2 = 0.0
+    zeros_count = 0
+    negative_count = 0
+    for i in range(values.size):
+        value = values[i]
+        vmin = min(vmin, value)
+        vmax = max(vmax, value)
+        delta = value - mean
+        mean += delta / (i + 1)
+        m2 += delta * (value - mean)
+        if value == 0:
+            zeros_count += 1
+        elif value < 0:
+            negative_count += 1
+    std = np.sqrt(m2 / (values.size - 1)) if values.size > 1 else np.nan
+    return vmin, vmax, mean, std, zeros_count, negative_count
+
+if njit is not None:
+    # fastmath is left off; it would allow reordering the Welford updates
+    _column_stats = njit(cache=True)(_column_stats)
+
+# Number of CSV rows read at a time when only counting rows
+CSV_CHUNK_SIZE = 200_000
+
+# Compressed CSVs are decompressed by the readers and can't be memory-mapped
+COMPRESSED_CSV_EXTENSIONS = ('.gz', '.bz2', '.zst', '.lz4', '.xz', '.zip')
+
+# Arrow types for known CSV fields: strings for IDs (which also keeps
+# leading zeros), and 64-bit floats for coordinates and scores so the
+# validated statistics and range checks see the values at full precision
+CSV_COLUMN_TYPES = {
+    'longitude': pa.float64(),
+    'latitude': pa.float64(),
+    'obsolescence_score': pa.float64(),
+    'confidence': pa.float64(),
+    'tile_id': pa.string(),
+    'GEOID': pa.string(),
+}
+
+# Validation results of unchanged files are reused from this cache; the least
+# recently used entries are dropped beyond VALIDATION_CACHE_SIZE entries
+VALIDATION_CACHE_FILE = 'data/cache/validation_cache.json'
+VALIDATION_CACHE_SIZE = 64
+
+
+def numeric_stats(values):
+    """
+    Calculate statistics of the non-null values of a numeric field.
+
+    Args:
+        values: Non-empty float64 array of the non-null values
+
+    Returns:
+        Dictionary with min, max, mean, median, std and the zero/negative counts
+    """
+    if njit is not None:
+        # One compiled pass over the values
+        vmin, vmax, mean, std, zeros_count, negative_count = _column_stats(np.ascontiguousarray(values))
+    else:
+        vmin = values.min()
+        vmax = values.max()
+        zeros_count = np.count_nonzero(values == 0)
+        negative_count = np.count_nonzero(values < 0)
+
+        # The standard deviation reuses the mean instead of computing it again
+        mean = values.mean()
+        deviations = values - mean
+        if len(values) > 1:
+            std = np.sqrt(np.dot(deviations, deviations) / (len(values) - 1))
+        else:
+            std = np.nan
+
+    zeros_count = int(zeros_count)
+    negative_count = int(negative_count)
+    return {
+        'min': float(vmin),
+        'max': float(vmax),
+        'mean': float(mean),
+        'median': float(np.median(values)),
+        'std': float(std),
+        'zeros_count': zeros_count,
+        'zeros_percentage': round(zeros_count / len(values) * 100, 2),
+        'negative_count': negative_count,
+        'negative_percentage': round(negative_count / len(values) * 100, 2)
+    }
+
+
+def read_csv_fields(csv_path, fields, column_types=None):
+    """
+    Read fields of a CSV file with the Arrow CSV reader and summarize them.
+
+    Only the requested columns are parsed, in parallel, straight into Arrow
+    buffers; no pandas DataFrame is built.
+
+    Args:
+        csv_path: Path to the CSV file
+        fields: Fields to read
+        column_types: Arrow types to parse fields as, or None to infer them
+
+    Returns:
+        Tuple of (row_count, summaries), where summaries maps each field to a
+        dictionary with its dtype, null count and non-null values (a float64
+        array, or None for non-numeric fields)
+    """
+    read_options = pacsv.ReadOptions(use_threads=True)
+    convert_options = pacsv.ConvertOptions(include_columns=fields, column_types=column_types or {},
+                                           strings_can_be_null=True)
+
+    # Uncompressed files are memory-mapped, so the parser reads pages the
+    # kernel faults in instead of copies made by read() calls. Compressed
+    # files are passed by path for Arrow to decompress
+    if csv_path.lower().endswith(COMPRESSED_CSV_EXTENSIONS):
+        table = pacsv.read_csv(csv_path, read_options=read_options, convert_options=convert_options)
+    else:
+        with pa.memory_map(csv_path) as source:
+            table = pacsv.read_csv(source, read_options=read_options, convert_options=convert_options)
+
+    summaries = {}
+    for field in fields:
+        column = table.column(field)
+        column_type = column.type
+        if pa.types.is_integer(column_type) or pa.types.is_floating(column_type) or pa.types.is_boolean(column_type):
+            field_values = pc.drop_null(column).to_numpy().astype(np.float64, copy=False)
+        else:
+            field_values = None
+        summaries[field] = {
+            'dtype': np.dtype(column_type.to_pandas_dtype()).name,
+            'null_count': column.null_count,
+            'values': field_values
+        }
+
+    return table.num_rows, summaries
+
+
+def _np_default(obj):
+    """Convert values json can't serialize: NumPy scalars to their Python values, anything else to str."""
+    return obj.item() if isinstance(obj, np.generic) else str(obj)
+
+
+def load_validation_cache():
+    """Load the validation cache, or an empty cache if it is missing or unreadable."""
+    try:
+        with open(VALIDATION_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def store_validation_cache(cache):
+    """Save the validation cache, keeping only the most recently used entries."""
+    while len(cache) > VALIDATION_CACHE_SIZE:
+        cache.pop(next(iter(cache)))
+
+    os.makedirs(os.path.dirname(VALIDATION_CACHE_FILE), exist_ok=True)
+    tmp_file = VALIDATION_CACHE_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(cache, f, default=_np_default)
+    os.replace(tmp_file, VALIDATION_CACHE_FILE)
+
+
+def cached_validation(validate):
+    """
+    Reuse the results of a validator while the validated file is unchanged.
+
+    Results are keyed by validator, absolute path, modification time, size,
+    required fields and strict mode, so any change to the file invalidates
+    them. Errors are never cached.
+    """
+    @functools.wraps(validate)
+    def wrapper(path, required_fields=None, output_path=None, strict=False):
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return validate(path, required_fields, output_path, strict)
+
+        key = hashlib.blake2b(
+            f"{validate.__name__}|{os.path.abspath(path)}|{file_stat.st_mtime_ns}|"
+            f"{file_stat.st_size}|{required_fields}|{strict}".encode()
+        ).hexdigest()
+
+        cache = load_validation_cache()
+        if key in cache:
+            # Move the entry to the end as the most recently used
+            validation = cache.pop(key)
+            cache[key] = validation
+            store_validation_cache(cache)
+            print(f"Using cached validation of unchanged file: {path}")
+
+            # Save validation report if output path is provided
+            if output_path:
+                save_validation_report(validation, output_path)
+
+            return validation
+
+        validation = validate(path, required_fields, output_path, strict)
+        if validation['status'] != 'error':
+            cache[key] = validation
+            store_validation_cache(cache)
+        return validation
+
+    return wrapper
+
+
+@cached_validation
+def validate_geojson(geojson_path, required_fields=None, output_path=None, strict=False):
     """
     Validate a GeoJSON file for data quality issues.
 
@@ -26,6 +255,8 @@ def validate_geojson(geojson_path, required_fields=None, output_path=None):
         geojson_path: Path to the GeoJSON file
         required_fields: List of required fields to check
         output_path: Path to save the validation report
+        strict: Stop at the first field with out-of-range values and report
+            it as an error
 
     Returns:
         Dictionary with validation results
@@ -44,8 +275,20 @@ def validate_geojson(geojson_path, required_fields=None, output_path=None):
         }
 
     try:
-        # Load GeoJSON file
-        gdf = gpd.read_file(geojson_path)
+        # Load GeoJSON file. Only the attribute columns are validated, so
+        # geometries are skipped unless 'geometry' is a required field, and
+        # only the required columns that exist in the file are read
+        if 'geometry' in required_fields:
+            try:
+                gdf = gpd.read_file(geojson_path, engine='pyogrio', use_arrow=True)
+            except TypeError:
+                # Older GeoPandas versions don't accept use_arrow
+                gdf = gpd.read_file(geojson_path, engine='pyogrio')
+        else:
+            file_fields = pyogrio.read_info(geojson_path)['fields']
+            columns = [field for field in required_fields if field in file_fields]
+            gdf = pyogrio.read_dataframe(geojson_path, columns=columns or None, read_geometry=False,
+                                         use_arrow=True)
 
         # Initialize validation results
         validation = {
@@ -74,45 +317,51 @@ def validate_geojson(geojson_path, required_fields=None, output_path=None):
             return validation
 
         # Validate each field
+        feature_count = len(gdf)
         for field in required_fields:
-            field_data = gdf[field]
-
             # Skip geometry field
             if field == 'geometry':
                 continue
 
+            # Each column is looked up once; everything below works on this
+            # Series, its dtype and its values
+            field_data = gdf[field]
+            field_dtype = field_data.dtype
+
             # Check data type
-            dtype = str(field_data.dtype)
+            dtype = str(field_dtype)
+
+            # Numeric fields are converted to one float64 array, and all of
+            # their statistics are calculated from it
+            is_numeric = pd.api.types.is_numeric_dtype(field_dtype)
+            if is_numeric:
+                values = field_data.to_numpy(dtype=np.float64, na_value=np.nan)
+                null_mask = np.isnan(values)
+                null_count = int(np.count_nonzero(null_mask))
+                non_null_data = values[~null_mask]
+            else:
+                null_count = int(field_data.isna().sum())
 
             # Calculate statistics
             stats = {
                 'dtype': dtype,
-                'count': len(field_data),
-                'null_count': field_data.isna().sum(),
-                'null_percentage': round(field_data.isna().sum() / len(field_data) * 100, 2) if len(field_data) > 0 else 0
+                'count': feature_count,
+                'null_count': null_count,
+                'null_percentage': round(null_count / feature_count * 100, 2) if feature_count > 0 else 0
             }
 
             # Add numeric statistics if applicable
-            if pd.api.types.is_numeric_dtype(field_data):
-                non_null_data = field_data.dropna()
-
+            if is_numeric:
                 if len(non_null_data) > 0:
-                    stats.update({
-                        'min': float(non_null_data.min()),
-                        'max': float(non_null_data.max()),
-                        'mean': float(non_null_data.mean()),
-                        'median': float(non_null_data.median()),
-                        'std': float(non_null_data.std()),
-                        'zeros_count': int((non_null_data == 0).sum()),
-                        'zeros_percentage': round((non_null_data == 0).sum() / len(non_null_data) * 100, 2) if len(non_null_data) > 0 else 0,
-                        'negative_count': int((non_null_data < 0).sum()),
-                        'negative_percentage': round((non_null_data < 0).sum() / len(non_null_data) * 100, 2) if len(non_null_data) > 0 else 0
-                    })
+                    stats.update(numeric_stats(non_null_data))
 
                     # Check for potential issues
                     if stats['null_percentage'] > 5:
                         validation['issues'].append(f"High null percentage in {field}: {stats['null_percentage']}%")
 
+                    # Issues added from here on are out-of-range values
+                    range_issues_start = len(validation['issues'])
+
                     if field == 'obsolescence_score':
                         if stats['min'] < 0:
                             validation['issues'].append(f"Negative values in {field}: {stats['negative_count']} values")
@@ -131,6 +380,19 @@ def validate_geojson(geojson_path, required_fields=None, output_path=None):
                         if stats['min'] < 0:
                             validation['issues'].append(f"Negative values in {field}: {stats['negative_count']} values")
 
+                    # In strict mode the first field with out-of-range values
+                    # fails the validation; later fields aren't checked
+                    if strict and len(validation['issues']) > range_issues_start:
+                        validation['status'] = 'error'
+                        validation['message'] = f"Out-of-range values in {field}"
+                        validation['fields'][field] = stats
+
+                        # Save validation report if output path is provided
+                        if output_path:
+                            save_validation_report(validation, output_path)
+
+                        return validation
+
             # Add field statistics to validation results
             validation['fields'][field] = stats
 
@@ -161,7 +423,8 @@ def validate_geojson(geojson_path, required_fields=None, output_path=None):
         return validation
 
 
-def validate_csv(csv_path, required_fields=None, output_path=None):
+@cached_validation
+def validate_csv(csv_path, required_fields=None, output_path=None, strict=False):
     """
     Validate a CSV file for data quality issues.
 
@@ -169,6 +432,8 @@ def validate_csv(csv_path, required_fields=None, output_path=None):
         csv_path: Path to the CSV file
         required_fields: List of required fields to check
         output_path: Path to save the validation report
+        strict: Stop at the first field with out-of-range values and report
+            it as an error
 
     Returns:
         Dictionary with validation results
@@ -187,24 +452,41 @@ def validate_csv(csv_path, required_fields=None, output_path=None):
         }
 
     try:
-        # Load CSV file
-        df = pd.read_csv(csv_path)
+        # Read only the header to check for required fields
+        columns = pd.read_csv(csv_path, nrows=0).columns
+        missing_fields = [field for field in required_fields if field not in columns]
+
+        # Read the required fields; if any are missing, only the rows are
+        # counted
+        if missing_fields:
+            # memory_map is ignored by pandas for compressed files
+            row_count = sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=[0], chunksize=CSV_CHUNK_SIZE,
+                                                                memory_map=True))
+        else:
+            try:
+                column_types = {field: CSV_COLUMN_TYPES[field] for field in required_fields
+                                if field in CSV_COLUMN_TYPES}
+                row_count, summaries = read_csv_fields(csv_path, required_fields, column_types)
+            except ValueError as e:
+                # Fields that don't parse as their compact dtype (e.g. text in
+                # a score column) are read with inferred dtypes instead
+                print(f"Could not read CSV with compact dtypes ({e}), inferring dtypes")
+                row_count, summaries = read_csv_fields(csv_path, required_fields)
 
         # Initialize validation results
         validation = {
             'status': 'success',
             'file_path': csv_path,
-            'row_count': len(df),
+            'row_count': row_count,
             'fields': {},
             'missing_fields': [],
             'issues': []
         }
 
         # Check for required fields
-        for field in required_fields:
-            if field not in df.columns:
-                validation['missing_fields'].append(field)
-                validation['issues'].append(f"Missing required field: {field}")
+        for field in missing_fields:
+            validation['missing_fields'].append(field)
+            validation['issues'].append(f"Missing required field: {field}")
 
         # If any required fields are missing, return early
         if validation['missing_fields']:
@@ -218,40 +500,37 @@ def validate_csv(csv_path, required_fields=None, output_path=None):
 
         # Validate each field
         for field in required_fields:
-            field_data = df[field]
+            summary = summaries[field]
 
             # Check data type
-            dtype = str(field_data.dtype)
+            dtype = summary['dtype']
+
+            # All statistics of numeric fields are calculated from the
+            # non-null values collected while reading
+            non_null_data = summary['values']
+            is_numeric = non_null_data is not None
+            null_count = summary['null_count']
 
             # Calculate statistics
             stats = {
                 'dtype': dtype,
-                'count': len(field_data),
-                'null_count': field_data.isna().sum(),
-                'null_percentage': round(field_data.isna().sum() / len(field_data) * 100, 2) if len(field_data) > 0 else 0
+                'count': row_count,
+                'null_count': null_count,
+                'null_percentage': round(null_count / row_count * 100, 2) if row_count > 0 else 0
             }
 
             # Add numeric statistics if applicable
-            if pd.api.types.is_numeric_dtype(field_data):
-                non_null_data = field_data.dropna()
-
+            if is_numeric:
                 if len(non_null_data) > 0:
-                    stats.update({
-                        'min': float(non_null_data.min()),
-                        'max': float(non_null_data.max()),
-                        'mean': float(non_null_data.mean()),
-                        'median': float(non_null_data.median()),
-                        'std': float(non_null_data.std()),
-                        'zeros_count': int((non_null_data == 0).sum()),
-                        'zeros_percentage': round((non_null_data == 0).sum() / len(non_null_data) * 100, 2) if len(non_null_data) > 0 else 0,
-                        'negative_count': int((non_null_data < 0).sum()),
-                        'negative_percentage': round((non_null_data < 0).sum() / len(non_null_data) * 100, 2) if len(non_null_data) > 0 else 0
-                    })
+                    stats.update(numeric_stats(non_null_data))
 
                     # Check for potential issues
                     if stats['null_percentage'] > 5:
                         validation['issues'].append(f"High null percentage in {field}: {stats['null_percentage']}%")
 
+                    # Issues added from here on are out-of-range values
+                    range_issues_start = len(validation['issues'])
+
                     if field == 'obsolescence_score':
                         if stats['min'] < 0:
                             validation['issues'].append(f"Negative values in {field}: {stats['negative_count']} values")
@@ -274,6 +553,19 @@ def validate_csv(csv_path, required_fields=None, output_path=None):
                         if field == 'latitude' and (stats['min'] < -90 or stats['max'] > 90):
                             validation['issues'].append(f"Invalid {field} range: min = {stats['min']}, max = {stats['max']}")
 
+                    # In strict mode the first field with out-of-range values
+                    # fails the validation; later fields aren't checked
+                    if strict and len(validation['issues']) > range_issues_start:
+                        validation['status'] = 'error'
+                        validation['message'] = f"Out-of-range values in {field}"
+                        validation['fields'][field] = stats
+
+                        # Save validation report if output path is provided
+                        if output_path:
+                            save_validation_report(validation, output_path)
+
+                        return validation
+
             # Add field statistics to validation results
             validation['fields'][field] = stats
 
@@ -315,27 +607,16 @@ def save_validation_report(validation, output_path):
     # Create directory if it doesn't exist
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    # Convert numpy types to Python native types
-    def convert_numpy_types(obj):
-        if isinstance(obj, dict):
-            return {k: convert_numpy_types(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [convert_numpy_types(item) for item in obj]
-        elif isinstance(obj, (np.int64, np.int32, np.int16, np.int8)):
-            return int(obj)
-        elif isinstance(obj, (np.float64, np.float32, np.float16)):
-            return float(obj)
-        elif isinstance(obj, np.bool_):
-            return bool(obj)
-        else:
-            return obj
-
-    # Convert numpy types in validation dictionary
-    validation_converted = convert_numpy_types(validation)
-
-    # Save validation report
-    with open(output_path, 'w') as f:
-        json.dump(validation_converted, f, indent=2)
+    # Save validation report. orjson serializes NumPy scalars natively; the
+    # json fallback converts them as it reaches them instead of copying the
+    # whole dictionary first
+    if orjson is not None:
+        data = orjson.dumps(validation, default=_np_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2)
+        Path(output_path).write_bytes(data)
+    else:
+        with open(output_path, 'w') as f:
+            json.dump(validation, f, indent=2, default=_np_default)
 
     print(f"Validation report saved to: {output_path}")
 
@@ -352,9 +633,13 @@ def main():
     parser.add_argument("--output", default=None,
                         help="Path to save the validation report (JSON)")
     parser.add_argument("--fields", nargs='+', default=None,
-                        help="List of required fields to check")
+                        help="List of required fields to check; statistics are only "
+                             "computed for these fields")
     parser.add_argument("--type", choices=['auto', 'csv', 'geojson'], default='auto',
                         help="Type of input file (default: auto-detect)")
+    parser.add_argument("--strict", action="store_true",
+                        help="Fail on the first field with out-of-range values "
+                             "instead of checking all fields")
 
     args = parser.parse_args()
 
@@ -379,9 +664,9 @@ def main():
 
     # Validate file
     if file_type == 'csv':
-        validation = validate_csv(args.input, args.fields, args.output)
+        validation = validate_csv(args.input, args.fields, args.output, strict=args.strict)
     else:  # geojson
-        validation = validate_geojson(args.input, args.fields, args.output)
+        validation = validate_geojson(args.input, args.fields, args.output, strict=args.strict)
 
     # Print validation summary
     print("\nValidation Summary:")
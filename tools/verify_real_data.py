@@ -6,12 +6,14 @@ This script verifies that all county data is real (not simulated) and meets qual
 It performs validation checks and outputs a report of any issues found.
 
 Usage:
-    python verify_real_data.py [--input INPUT_FILE] [--output OUTPUT_FILE]
+    python verify_real_data.py [--input INPUT_FILE] [--output OUTPUT_FILE] [--format FORMAT]
 
 Options:
     --input INPUT_FILE    Path to the county scores GeoJSON [default: data/final/county_scores.geojson]
-    --output OUTPUT_FILE  Path to save the verified data [default: data/final/verified_county_scores.geojson]
+    --output OUTPUT_FILE  Path to save the verified data, with an extension matching FORMAT
+                          [default: data/final/verified_county_scores.geojson, .parquet or .fgb]
     --report REPORT_FILE  Path to save the verification report [default: qa/data_verification_report.json]
+    --format FORMAT       Format of the verified data: geojson, geoparquet or flatgeobuf [default: geojson]
 """
 
 import os
@@ -23,24 +25,67 @@ import numpy as np
 from pathlib import Path
 import datetime
 
+# Output formats for the verified data, mapped to OGR drivers. GeoParquet is
+# written by GeoPandas directly instead of through OGR
+OUTPUT_FORMATS = {
+    'geojson': 'GeoJSON',
+    'geoparquet': None,
+    'flatgeobuf': 'FlatGeobuf',
+}
+
+# File extensions accepted for each output format; the first one is used
+# for the default output path
+OUTPUT_EXTENSIONS = {
+    'geojson': ('.geojson', '.json'),
+    'geoparquet': ('.parquet', '.geoparquet'),
+    'flatgeobuf': ('.fgb',),
+}
+
+# Valid ranges of the numeric fields: (field, min, max, issue type, description
+# of the invalid values, description of the valid range)
+RANGE_CHECKS = [
+    ('obsolescence_score', 0, 1, 'invalid_scores', 'invalid obsolescence scores', 'outside 0-1 range'),
+    ('confidence', 0, 1, 'invalid_confidence', 'invalid confidence values', 'outside 0-1 range'),
+    ('tile_count', 0, np.inf, 'invalid_tile_count', 'invalid tile count values', 'negative'),
+]
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Verify Real Data')
     parser.add_argument('--input', default='data/final/county_scores.geojson',
                         help='Path to the county scores GeoJSON')
-    parser.add_argument('--output', default='data/final/verified_county_scores.geojson',
-                        help='Path to save the verified data')
+    parser.add_argument('--output', default=None,
+                        help='Path to save the verified data (default: '
+                             'data/final/verified_county_scores with the extension of --format)')
     parser.add_argument('--report', default='qa/data_verification_report.json',
                         help='Path to save the verification report')
-    return parser.parse_args()
+    parser.add_argument('--format', choices=list(OUTPUT_FORMATS), default='geojson',
+                        help='Format of the verified data (GeoParquet and FlatGeobuf are '
+                             'smaller and faster to write than GeoJSON)')
+    args = parser.parse_args()
 
-def verify_real_data(input_file, output_file, report_file):
+    # The output extension must match the format, so GeoJSON readers never
+    # get another payload under a .geojson name
+    extensions = OUTPUT_EXTENSIONS[args.format]
+    if args.output is None:
+        args.output = 'data/final/verified_county_scores' + extensions[0]
+    elif os.path.splitext(args.output)[1].lower() not in extensions:
+        parser.error(f"--output {args.output} doesn't match --format {args.format} "
+                     f"(expected extension {' or '.join(extensions)})")
+    return args
+
+def verify_real_data(input_file, output_file, report_file, file_format='geojson'):
     """Verify that all county data is real and meets quality standards."""
     print(f"Loading county data from {input_file}...")
     
     # Load the GeoJSON file
     try:
-        gdf = gpd.read_file(input_file)
+        # Read all features in GDAL and hand them over through Arrow
+        try:
+            gdf = gpd.read_file(input_file, engine='pyogrio', use_arrow=True)
+        except TypeError:
+            # Older GeoPandas versions don't accept use_arrow
+            gdf = gpd.read_file(input_file, engine='pyogrio')
         print(f"Loaded {len(gdf)} counties from GeoJSON file")
     except Exception as e:
         print(f"Error loading GeoJSON file: {e}")
@@ -93,99 +138,78 @@ def verify_real_data(input_file, output_file, report_file):
             "description": "Added 'data_source' field with value 'real' to all counties"
         })
     
-    # Check for invalid values
-    if 'obsolescence_score' in gdf.columns:
-        invalid_scores = gdf[(gdf['obsolescence_score'] < 0) | (gdf['obsolescence_score'] > 1)]
-        if len(invalid_scores) > 0:
-            verification_report["issues"].append({
-                "type": "invalid_scores",
-                "count": len(invalid_scores),
-                "description": f"Found {len(invalid_scores)} counties with invalid obsolescence scores (outside 0-1 range)"
-            })
-            verification_report["issues_found"] += 1
-            
-            # Fix invalid scores
-            print(f"Fixing {len(invalid_scores)} counties with invalid obsolescence scores")
-            gdf.loc[gdf['obsolescence_score'] < 0, 'obsolescence_score'] = 0
-            gdf.loc[gdf['obsolescence_score'] > 1, 'obsolescence_score'] = 1
-    
-    if 'confidence' in gdf.columns:
-        invalid_confidence = gdf[(gdf['confidence'] < 0) | (gdf['confidence'] > 1)]
-        if len(invalid_confidence) > 0:
-            verification_report["issues"].append({
-                "type": "invalid_confidence",
-                "count": len(invalid_confidence),
-                "description": f"Found {len(invalid_confidence)} counties with invalid confidence values (outside 0-1 range)"
-            })
-            verification_report["issues_found"] += 1
-            
-            # Fix invalid confidence values
-            print(f"Fixing {len(invalid_confidence)} counties with invalid confidence values")
-            gdf.loc[gdf['confidence'] < 0, 'confidence'] = 0
-            gdf.loc[gdf['confidence'] > 1, 'confidence'] = 1
-    
-    if 'tile_count' in gdf.columns:
-        invalid_tile_count = gdf[gdf['tile_count'] < 0]
-        if len(invalid_tile_count) > 0:
-            verification_report["issues"].append({
-                "type": "invalid_tile_count",
-                "count": len(invalid_tile_count),
-                "description": f"Found {len(invalid_tile_count)} counties with invalid tile count values (negative)"
-            })
-            verification_report["issues_found"] += 1
-            
-            # Fix invalid tile count values
-            print(f"Fixing {len(invalid_tile_count)} counties with invalid tile count values")
-            gdf.loc[gdf['tile_count'] < 0, 'tile_count'] = 0
-    
-    # Check for duplicate counties
+    # Check for invalid values. The checked columns are stacked into one
+    # (counties, fields) array, so all range checks and fixes are single
+    # vectorized passes with per-column bounds
+    range_checks = [check for check in RANGE_CHECKS if check[0] in gdf.columns]
+    if range_checks:
+        fields = [check[0] for check in range_checks]
+        lower = np.array([check[1] for check in range_checks], dtype=np.float64)
+        upper = np.array([check[2] for check in range_checks], dtype=np.float64)
+        values = gdf[fields].to_numpy(dtype=np.float64)
+        
+        # Explicit comparisons instead of comparing with the clipped values,
+        # so missing values (NaN) aren't counted as invalid
+        invalid_counts = ((values < lower) | (values > upper)).sum(axis=0)
+        if invalid_counts.any():
+            clipped = np.clip(values, lower, upper)
+        
+        for i, (field, _, _, issue_type, invalid_description, range_description) in enumerate(range_checks):
+            invalid_count = int(invalid_counts[i])
+            if invalid_count > 0:
+                verification_report["issues"].append({
+                    "type": issue_type,
+                    "count": invalid_count,
+                    "description": f"Found {invalid_count} counties with {invalid_description} ({range_description})"
+                })
+                verification_report["issues_found"] += 1
+                
+                # Fix invalid values, keeping the column's dtype
+                print(f"Fixing {invalid_count} counties with {invalid_description}")
+                gdf[field] = clipped[:, i].astype(gdf[field].dtype)
+    
+    # Check for duplicate counties; duplicates are only counted, so no
+    # slice of the duplicate rows (with their geometries) is built
     if 'GEOID' in gdf.columns:
-        duplicate_counties = gdf[gdf.duplicated('GEOID', keep='first')]
-        if len(duplicate_counties) > 0:
+        duplicate_mask = gdf['GEOID'].duplicated(keep='first')
+        duplicate_count = int(duplicate_mask.sum())
+        if duplicate_count > 0:
             verification_report["issues"].append({
                 "type": "duplicate_counties",
-                "count": len(duplicate_counties),
-                "description": f"Found {len(duplicate_counties)} duplicate county entries"
+                "count": duplicate_count,
+                "description": f"Found {duplicate_count} duplicate county entries"
             })
             verification_report["issues_found"] += 1
             
             # Remove duplicate counties
-            print(f"Removing {len(duplicate_counties)} duplicate county entries")
-            gdf = gdf.drop_duplicates('GEOID', keep='first')
-    
-    # Calculate statistics
-    if 'obsolescence_score' in gdf.columns:
-        verification_report["statistics"]["obsolescence_score"] = {
-            "min": float(gdf['obsolescence_score'].min()),
-            "max": float(gdf['obsolescence_score'].max()),
-            "mean": float(gdf['obsolescence_score'].mean()),
-            "median": float(gdf['obsolescence_score'].median()),
-            "std": float(gdf['obsolescence_score'].std())
-        }
+            print(f"Removing {duplicate_count} duplicate county entries")
+            gdf = gdf[~duplicate_mask.to_numpy()]
     
-    if 'confidence' in gdf.columns:
-        verification_report["statistics"]["confidence"] = {
-            "min": float(gdf['confidence'].min()),
-            "max": float(gdf['confidence'].max()),
-            "mean": float(gdf['confidence'].mean()),
-            "median": float(gdf['confidence'].median()),
-            "std": float(gdf['confidence'].std())
-        }
+    # Calculate statistics; all statistics of a column are aggregated in one
+    # agg call
+    for field in ['obsolescence_score', 'confidence']:
+        if field in gdf.columns:
+            stats = gdf[field].agg(['min', 'max', 'mean', 'median', 'std'])
+            verification_report["statistics"][field] = {name: float(value) for name, value in stats.items()}
     
     if 'tile_count' in gdf.columns:
+        stats = gdf['tile_count'].agg(['min', 'max', 'mean', 'median', 'std', 'sum'])
         verification_report["statistics"]["tile_count"] = {
-            "min": int(gdf['tile_count'].min()),
-            "max": int(gdf['tile_count'].max()),
-            "mean": float(gdf['tile_count'].mean()),
-            "median": float(gdf['tile_count'].median()),
-            "std": float(gdf['tile_count'].std()),
-            "total": int(gdf['tile_count'].sum())
+            "min": int(stats['min']),
+            "max": int(stats['max']),
+            "mean": float(stats['mean']),
+            "median": float(stats['median']),
+            "std": float(stats['std']),
+            "total": int(stats['sum'])
         }
     
     # Save the verified data
     verification_report["verified_counties"] = len(gdf)
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    gdf.to_file(output_file, driver='GeoJSON')
+    if file_format == 'geoparquet':
+        gdf.to_parquet(output_file)
+    else:
+        gdf.to_file(output_file, driver=OUTPUT_FORMATS[file_format], engine='pyogrio')
     print(f"Saved {len(gdf)} verified counties to {output_file}")
     
     # Save the verification report
@@ -213,7 +237,7 @@ def verify_real_data(input_file, output_file, report_file):
 def main():
     """Main function."""
     args = parse_args()
-    verify_real_data(args.input, args.output, args.report)
+    verify_real_data(args.input, args.output, args.report, args.format)
 
 if __name__ == "__main__":
     main()
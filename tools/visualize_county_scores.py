@@ -10,11 +10,31 @@ obsolescence scores per county.
 
 import os
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 import geopandas as gpd
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
 import numpy as np
 
+try:
+    import datashader as ds
+except ImportError:
+    ds = None
+
+# Size in pixels of the raster drawn by the datashader engine
+DATASHADER_WIDTH = 2400
+DATASHADER_HEIGHT = 1600
+
+# Default resolution of raster (PNG) outputs
+DEFAULT_DPI = 150
+
+# Keep text in SVG outputs as editable text instead of paths
+plt.rcParams['svg.fonttype'] = 'none'
+
+# Default simplification tolerance in degrees; detail below this is smaller
+# than a pixel on a national map
+SIMPLIFY_TOLERANCE = 0.005
+
 
 def load_county_geojson(geojson_path):
     """
@@ -28,15 +48,69 @@ def load_county_geojson(geojson_path):
     """
     print(f"Loading county GeoJSON from {geojson_path}...")
     
-    # Read the GeoJSON file
-    gdf = gpd.read_file(geojson_path)
+    # Read the GeoJSON file; all features are read in GDAL and handed over
+    # through Arrow
+    try:
+        gdf = gpd.read_file(geojson_path, engine='pyogrio', use_arrow=True)
+    except TypeError:
+        # Older GeoPandas versions don't accept use_arrow
+        gdf = gpd.read_file(geojson_path, engine='pyogrio')
     
     print(f"Loaded {len(gdf)} counties with scores")
     
     return gdf
 
 
-def create_visualization(gdf, output_path, column='obsolescence_score', title=None):
+def simplify_geometries(gdf, tolerance=SIMPLIFY_TOLERANCE):
+    """
+    Simplify county polygons for plotting.
+    
+    Args:
+        gdf: GeoDataFrame with county polygons
+        tolerance: Simplification tolerance in the units of the CRS; 0 keeps
+            the full geometries
+        
+    Returns:
+        Copy of the GeoDataFrame with simplified geometries
+    """
+    if not tolerance:
+        return gdf
+    
+    gdf = gdf.copy()
+    gdf['geometry'] = gdf.geometry.simplify(tolerance, preserve_topology=False)
+    return gdf
+
+
+def plot_datashader(gdf, column, cmap, ax, norm=None):
+    """
+    Rasterize county polygons with datashader and draw the raster on an axis.
+    
+    The polygons are filled by datashader's compiled kernels; matplotlib only
+    draws the resulting image, the axes and the colorbar.
+    
+    Args:
+        gdf: GeoDataFrame with county polygons and scores
+        column: Column to visualize
+        cmap: Colormap for the scores
+        ax: Matplotlib axis to draw on
+        norm: Normalization of the scores, or None to use their own range
+    """
+    if ds is None:
+        raise ImportError("The datashader package is required for the datashader engine")
+    
+    minx, miny, maxx, maxy = gdf.total_bounds
+    canvas = ds.Canvas(plot_width=DATASHADER_WIDTH, plot_height=DATASHADER_HEIGHT,
+                       x_range=(minx, maxx), y_range=(miny, maxy))
+    agg = canvas.polygons(gdf, geometry='geometry', agg=ds.mean(column))
+    
+    # Pixels outside every county are NaN and stay transparent
+    image = ax.imshow(agg.values, origin='lower', extent=(minx, maxx, miny, maxy),
+                      cmap=cmap, norm=norm, interpolation='nearest')
+    ax.figure.colorbar(image, ax=ax)
+
+
+def create_visualization(gdf, output_path, column='obsolescence_score', title=None,
+                         simplify_tolerance=SIMPLIFY_TOLERANCE, engine='matplotlib', dpi=DEFAULT_DPI):
     """
     Create a visualization of county scores.
     
@@ -45,12 +119,20 @@ def create_visualization(gdf, output_path, column='obsolescence_score', title=No
         output_path: Path to save the visualization
         column: Column to visualize
         title: Title for the visualization
+        simplify_tolerance: Tolerance for simplifying the county polygons
+            before plotting (0 to disable)
+        engine: 'matplotlib' to draw the polygons as patches, or 'datashader'
+            to rasterize them first
+        dpi: Resolution of raster outputs
         
     Returns:
         Path to the saved visualization
     """
     print(f"Creating visualization for {column}...")
     
+    # Drop vertices that wouldn't be visible at the output resolution
+    gdf = simplify_geometries(gdf, simplify_tolerance)
+    
     # Create figure and axis
     fig, ax = plt.subplots(1, 1, figsize=(15, 10))
     
@@ -58,14 +140,17 @@ def create_visualization(gdf, output_path, column='obsolescence_score', title=No
     cmap = plt.cm.RdBu_r
     
     # Plot counties with scores
-    gdf.plot(
-        column=column,
-        cmap=cmap,
-        linewidth=0.5,
-        edgecolor='black',
-        legend=True,
-        ax=ax
-    )
+    if engine == 'datashader':
+        plot_datashader(gdf, column, cmap, ax)
+    else:
+        gdf.plot(
+            column=column,
+            cmap=cmap,
+            linewidth=0.5,
+            edgecolor='black',
+            legend=True,
+            ax=ax
+        )
     
     # Set title and labels
     if title:
@@ -76,22 +161,56 @@ def create_visualization(gdf, output_path, column='obsolescence_score', title=No
     ax.set_xlabel('Longitude', fontsize=12)
     ax.set_ylabel('Latitude', fontsize=12)
     
-    # Save the figure
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
+    # Save the figure; the format follows the output path's extension
+    fig.savefig(output_path, dpi=dpi, bbox_inches='tight', pad_inches=0.1)
+    fig.clear()
+    plt.close(fig)
     
     print(f"Saved visualization to {output_path}")
     
     return output_path
 
 
-def create_combined_visualization(regions, output_path):
+def render_region(task):
+    """
+    Create the visualization of a region in a worker process.
+    
+    The region is given as the path of its county GeoJSON, which is loaded
+    in the worker so no GeoDataFrame is pickled between processes, or as a
+    GeoDataFrame the main process already loaded (see main).
+    
+    Args:
+        task: Tuple of (region, geojson_path or GeoDataFrame, output_path,
+            simplify_tolerance, engine, dpi)
+        
+    Returns:
+        Path to the saved visualization
+    """
+    region, source, output_path, simplify_tolerance, engine, dpi = task
+    gdf = load_county_geojson(source) if isinstance(source, str) else source
+    return create_visualization(
+        gdf,
+        output_path,
+        title=f'Obsolescence Score by County - {region.title()} Region',
+        simplify_tolerance=simplify_tolerance,
+        engine=engine,
+        dpi=dpi
+    )
+
+
+def create_combined_visualization(regions, output_path, simplify_tolerance=SIMPLIFY_TOLERANCE,
+                                  dpi=DEFAULT_DPI, engine='matplotlib'):
     """
     Create a combined visualization of all regions.
     
     Args:
         regions: Dictionary of region names and GeoDataFrames
         output_path: Path to save the visualization
+        simplify_tolerance: Tolerance for simplifying the county polygons
+            before plotting (0 to disable)
+        dpi: Resolution of raster outputs
+        engine: 'matplotlib' to draw the polygons as patches, or 'datashader'
+            to rasterize them first
         
     Returns:
         Path to the saved visualization
@@ -104,9 +223,10 @@ def create_combined_visualization(regions, output_path):
     # Create a custom colormap
     cmap = plt.cm.RdBu_r
     
-    # Get the min and max values across all regions
-    min_val = min([gdf['obsolescence_score'].min() for gdf in regions.values()])
-    max_val = max([gdf['obsolescence_score'].max() for gdf in regions.values()])
+    # Get the min and max values across all regions in one pass over the
+    # concatenated scores
+    scores = np.concatenate([gdf['obsolescence_score'].to_numpy(dtype=float) for gdf in regions.values()])
+    min_val, max_val = float(np.nanmin(scores)), float(np.nanmax(scores))
     
     # Create a normalization for the colormap
     norm = colors.Normalize(vmin=min_val, vmax=max_val)
@@ -115,16 +235,20 @@ def create_combined_visualization(regions, output_path):
     for i, (region, gdf) in enumerate(regions.items()):
         ax = axes[i]
         
-        # Plot counties with scores
-        gdf.plot(
-            column='obsolescence_score',
-            cmap=cmap,
-            norm=norm,
-            linewidth=0.5,
-            edgecolor='black',
-            legend=True,
-            ax=ax
-        )
+        # Plot counties with scores, without sub-pixel detail
+        gdf = simplify_geometries(gdf, simplify_tolerance)
+        if engine == 'datashader':
+            plot_datashader(gdf, 'obsolescence_score', cmap, ax, norm=norm)
+        else:
+            gdf.plot(
+                column='obsolescence_score',
+                cmap=cmap,
+                norm=norm,
+                linewidth=0.5,
+                edgecolor='black',
+                legend=True,
+                ax=ax
+            )
         
         # Set title and labels
         ax.set_title(f'{region.title()} Region', fontsize=16)
@@ -137,9 +261,10 @@ def create_combined_visualization(regions, output_path):
     # Adjust layout
     plt.tight_layout(rect=[0, 0, 1, 0.95])
     
-    # Save the figure
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
+    # Save the figure; the format follows the output path's extension
+    fig.savefig(output_path, dpi=dpi, bbox_inches='tight', pad_inches=0.1)
+    fig.clear()
+    plt.close(fig)
     
     print(f"Saved combined visualization to {output_path}")
     
@@ -159,14 +284,24 @@ def main():
     # Optional arguments
     parser.add_argument("--combined", action="store_true",
                         help="Create a combined visualization of all regions")
+    parser.add_argument("--simplify-tol", type=float, default=SIMPLIFY_TOLERANCE,
+                        help="Tolerance in degrees for simplifying county polygons "
+                             f"before plotting, 0 to disable (default: {SIMPLIFY_TOLERANCE})")
+    parser.add_argument("--engine", choices=['matplotlib', 'datashader'], default='matplotlib',
+                        help="Renderer for the maps; datashader rasterizes the "
+                             "polygons, which is faster for large national maps")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI,
+                        help=f"Resolution of PNG outputs (default: {DEFAULT_DPI})")
+    parser.add_argument("--format", choices=['png', 'svg', 'pdf'], default='png',
+                        help="Output format; SVG and PDF keep the county polygons as vectors")
     
     args = parser.parse_args()
     
     # Create output directory if it doesn't exist
     os.makedirs(args.output_dir, exist_ok=True)
     
-    # Load county GeoJSON files for each region
-    regions = {}
+    # Find the county GeoJSON file for each region
+    region_files = {}
     for region in args.regions:
         geojson_path = f"data/{region}/county_joined.geojson"
         
@@ -176,24 +311,37 @@ def main():
             print(f"Skipping region: {region}")
             continue
         
-        # Load the GeoJSON file
-        gdf = load_county_geojson(geojson_path)
-        
-        # Add to the dictionary
-        regions[region] = gdf
-        
-        # Create visualization for the region
-        output_path = os.path.join(args.output_dir, f"{region}_counties.png")
-        create_visualization(
-            gdf,
-            output_path,
-            title=f'Obsolescence Score by County - {region.title()} Region'
-        )
+        region_files[region] = geojson_path
+    
+    # The combined visualization needs every region in this process, so the
+    # regions are then loaded and simplified once here and the simplified
+    # frames are handed to the workers. Otherwise each worker loads its own
+    # region from the file
+    simplify_tolerance = args.simplify_tol
+    if args.combined:
+        region_sources = {
+            region: simplify_geometries(load_county_geojson(geojson_path), simplify_tolerance)
+            for region, geojson_path in region_files.items()
+        }
+        simplify_tolerance = 0
+    else:
+        region_sources = region_files
+    
+    # Create the visualization for each region. Rendering is CPU-bound and
+    # matplotlib isn't thread-safe, so regions are rendered in separate processes
+    tasks = [
+        (region, source, os.path.join(args.output_dir, f"{region}_counties.{args.format}"),
+         simplify_tolerance, args.engine, args.dpi)
+        for region, source in region_sources.items()
+    ]
+    if tasks:
+        with ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1)) as executor:
+            list(executor.map(render_region, tasks))
     
     # Create combined visualization if requested
-    if args.combined and len(regions) > 0:
-        output_path = os.path.join(args.output_dir, "combined_counties.png")
-        create_combined_visualization(regions, output_path)
+    if args.combined and len(region_sources) > 0:
+        output_path = os.path.join(args.output_dir, f"combined_counties.{args.format}")
+        create_combined_visualization(region_sources, output_path, simplify_tolerance, args.dpi, args.engine)
     
     print("Done!")
 